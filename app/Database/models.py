@@ -1,6 +1,7 @@
 """Database models and schema definitions for SignalTrader"""
 
-from typing import Dict
+from functools import cached_property
+from typing import Dict, Optional
 
 
 class DatabaseSchema:
@@ -69,6 +70,13 @@ class SignalModel:
             "current_time": data_tuple[11]
         })
 
+    @cached_property
+    def message_link(self) -> Optional[str]:
+        """t.me link to the source Telegram message, or None if the signal has no message"""
+        if not (self.telegram_message_chatid and self.telegram_message_id):
+            return None
+        return f"https://t.me/c/{abs(int(self.telegram_message_chatid))}/{self.telegram_message_id}"
+
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
         return {
@@ -114,8 +114,9 @@ class SQLiteRepository(Generic[T]):
             self.cache.invalidate_pattern(f"{self.table_name}:")
             self.cache.invalidate(f"{self.table_name}:get_by_id:{record_id}")
     
-    def execute_query(self, query: str, params: Tuple = ()) -> List[Tuple]:
-        if self.cache:
+    def execute_query(self, query: str, params: Tuple = (), use_cache: bool = True) -> List[Tuple]:
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
             # Create a cache key from query and params
             cache_key = f"{self.table_name}:query:{hash((query, str(params)))}"
             cached_result = self.cache.get(cache_key)
@@ -128,7 +129,7 @@ class SQLiteRepository(Generic[T]):
             cursor.execute(query, params)
             result = cursor.fetchall()
 
-        if self.cache:
+        if use_cache:
             self.cache.put(cache_key, result)
 
         return result
@@ -8,6 +8,9 @@ from ..models import PositionModel
 class PositionRepository:
     """Repository for position-related database operations"""
 
+    # Max IDs bound per IN (...) query
+    IN_QUERY_BATCH_SIZE = 500
+
     def __init__(self, db_path: str = "signaltrader.db", enable_cache: bool = True):
         self.repository = SQLiteRepository(db_path, "Positions", enable_cache=enable_cache)
 
@@ -36,6 +39,23 @@ class PositionRepository:
         results = self.repository.execute_query(query, (ticket,))
         return PositionModel.from_tuple(results[0]) if results else None
 
+    def get_positions_by_tickets(self, tickets: List[int]) -> List[PositionModel]:
+        """Get positions whose MT5 ticket (position_id field) is in tickets, in one query per batch"""
+        tickets = list(dict.fromkeys(tickets))
+        positions = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(tickets), self.IN_QUERY_BATCH_SIZE):
+            batch = tickets[start:start + self.IN_QUERY_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            query = f"""
+                SELECT *
+                FROM positions
+                WHERE position_id IN ({placeholders})
+            """
+            results = self.repository.execute_query(query, tuple(batch))
+            positions.extend(PositionModel.from_tuple(result) for result in results)
+        return positions
+
     def get_positions_by_signal_id(self, signal_id: int) -> List[PositionModel]:
         """Get all positions for a signal"""
         query = """
@@ -118,6 +138,22 @@ class PositionRepository:
         results = self.repository.get_all()
         return [PositionModel.from_tuple(result) for result in results]
 
+    def get_positions_sample(self, limit: int = 10) -> List[PositionModel]:
+        """Get the first `limit` positions in table order"""
+        query = """
+            SELECT *
+            FROM positions
+            ORDER BY id
+            LIMIT ?
+        """
+        results = self.repository.execute_query(query, (limit,))
+        return [PositionModel.from_tuple(result) for result in results]
+
+    def count_positions(self) -> int:
+        """Get the number of stored positions"""
+        results = self.repository.execute_query("SELECT COUNT(*) FROM positions")
+        return results[0][0] if results else 0
+
     def get_active_positions_with_signals(self) -> List[Dict]:
         """Get all active positions linked with signal details"""
         query = """
@@ -3,14 +3,28 @@
 from typing import List, Dict, Optional, Any
 from loguru import logger
 from .Repository import SQLiteRepository
+from .cache import LRUCache
 from ..models import SignalModel
 
+# position_id -> SignalModel, shared by every SignalRepository so a write
+# through one instance is seen by the history and open-positions views
+_position_signal_cache = LRUCache(max_size=4096, default_ttl=30.0)
+
 
 class SignalRepository:
     """Repository for signal-related database operations"""
 
+    # Max IDs bound per IN (...) query
+    IN_QUERY_BATCH_SIZE = 500
+
     def __init__(self, db_path: str = "signaltrader.db", enable_cache: bool = True):
         self.repository = SQLiteRepository(db_path, "Signals", enable_cache=enable_cache)
+        self._position_signal_cache = _position_signal_cache if enable_cache else None
+
+    def _invalidate_position_signals(self) -> None:
+        """Drop cached position -> signal lookups after a signal write"""
+        if self._position_signal_cache:
+            self._position_signal_cache.clear()
 
     def create_table(self) -> None:
         """Create the signals table"""
@@ -19,7 +33,9 @@ class SignalRepository:
 
     def insert_signal(self, signal_data: Dict[str, Any]) -> int:
         """Insert a new signal into the database"""
-        return self.repository.insert(signal_data)
+        signal_id = self.repository.insert(signal_data)
+        self._invalidate_position_signals()
+        return signal_id
 
     def get_signal_by_id(self, signal_id: int) -> Optional[SignalModel]:
         """Get signal by ID"""
@@ -28,6 +44,12 @@ class SignalRepository:
 
     def get_signal_by_position_id(self, position_id: int) -> Optional[SignalModel]:
         """Get signal associated with a position ID"""
+        cache = self._position_signal_cache
+        if cache:
+            signal = cache.get(str(position_id))
+            if signal is not None:
+                return signal
+
         query = """
             SELECT s.*
             FROM Signals s
@@ -35,10 +57,44 @@ class SignalRepository:
             WHERE p.position_id = ?
             LIMIT 1
         """
-        results = self.repository.execute_query(query, (position_id,))
+        # Skip the per-instance query cache; _position_signal_cache fronts this lookup
+        results = self.repository.execute_query(query, (position_id,), use_cache=False)
         if not results:
             return None
-        return SignalModel.from_tuple(results[0])
+        signal = SignalModel.from_tuple(results[0])
+        if cache:
+            cache.put(str(position_id), signal)
+        return signal
+
+    def get_signals_by_position_ids(self, position_ids: List[int]) -> Dict[int, SignalModel]:
+        """Get signals for many position IDs in one query, keyed by position ID"""
+        signals: Dict[int, SignalModel] = {}
+        cache = self._position_signal_cache
+        ids = []
+        for position_id in dict.fromkeys(position_ids):
+            signal = cache.get(str(position_id)) if cache else None
+            if signal is not None:
+                signals[position_id] = signal
+            else:
+                ids.append(position_id)
+
+        # Stay under SQLite's bound-parameter limit on large histories
+        for start in range(0, len(ids), self.IN_QUERY_BATCH_SIZE):
+            batch = ids[start:start + self.IN_QUERY_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            query = f"""
+                SELECT p.position_id, s.*
+                FROM Signals s
+                INNER JOIN Positions p ON p.signal_id = s.id
+                WHERE p.position_id IN ({placeholders})
+            """
+            rows = self.repository.execute_query(query, tuple(batch), use_cache=False)
+            for row in rows:
+                if row[0] not in signals:
+                    signals[row[0]] = signal = SignalModel.from_tuple(row[1:])
+                    if cache:
+                        cache.put(str(row[0]), signal)
+        return signals
 
     def get_signal_by_chat(self, chat_id: int, message_id: int) -> Optional[Dict]:
         """Get signal by chat and message ID"""
@@ -88,11 +144,13 @@ class SignalRepository:
     def update_stop_loss(self, signal_id: int, stop_loss: float) -> None:
         """Update stop loss for a signal"""
         self.repository.update(signal_id, {"stop_loss": stop_loss})
+        self._invalidate_position_signals()
 
     def update_take_profits(self, signal_id: int, take_profits: List[float]) -> None:
         """Update take profit levels for a signal"""
         tp_list = ','.join(map(str, take_profits))
         self.repository.update(signal_id, {"tp_list": tp_list})
+        self._invalidate_position_signals()
 
     def get_all_signals(self) -> List[SignalModel]:
         """Get all signals"""
@@ -155,7 +155,7 @@ class MetaTrader:
     # Static trading operations
     @staticmethod
     def Trade(message_username, message_id, message_chatid, actionType, symbol, openPrice, secondPrice, tp_list, sl, comment, provider="telegram"):
-        TradingOperations.trade(message_username, message_id, message_chatid, actionType, symbol, openPrice, secondPrice, tp_list, sl, comment, provider)
+        return TradingOperations.trade(message_username, message_id, message_chatid, actionType, symbol, openPrice, secondPrice, tp_list, sl, comment, provider)
 
     @staticmethod
     def RiskFreePositions(chat_id, message_id):
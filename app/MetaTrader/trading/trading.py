@@ -44,7 +44,10 @@ class TradingOperations:
 
     @staticmethod
     def trade(message_username, message_id, message_chatid, actionType, symbol, openPrice, secondPrice, tp_list, sl, comment, provider="telegram"):
-        """Execute a complete trading operation"""
+        """Execute a complete trading operation
+
+        Returns the id of the saved signal, or None if the trade was rejected before saving.
+        """
         # logger.debug(f"Processing trade signal: {actionType.name} {symbol}")
 
         mtAccount = TradingOperations._get_mt_account_config()
@@ -190,6 +193,8 @@ class TradingOperations:
                     params['closerPrice'], params['isFirst'], params['isSecond']
                 )
 
+        return signal_id
+
     @staticmethod
     def _process_position_for_risk_free(mt, mtAccount, position, entry_price):
         """Process a single position for risk-free operation"""
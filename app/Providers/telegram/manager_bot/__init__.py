@@ -8,6 +8,7 @@ Modular structure for Telegram bot functionality:
 - actions.py: Trade operation handlers
 - input_handlers.py: Keyboard input processing
 - helpers.py: Utility methods and database queries
+- state.py: Per-user conversation state and bounded session store
 """
 
 from .manager_bot import TelegramManagerBot
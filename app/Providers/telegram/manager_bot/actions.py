@@ -2,206 +2,252 @@
 Trade action handlers for close, update SL/TP, delete order
 """
 
+import functools
+
 from loguru import logger
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+from Database import Migrations
+from .helpers import back_button, run_mt
+from .state import UserState, UserStateStore
+
+# Component-bound logger; methods cached at import for the per-position close loop
+_log = logger.bind(comp="manager.actions")
+_info = _log.info
+_warning = _log.warning
+_error = _log.error
+
+
+def _requires_mt(method):
+    """Reply with 'MetaTrader not available' instead of running the action when MT is not connected"""
+    @functools.wraps(method)
+    async def wrapper(self, query, *args, **kwargs):
+        if not self.meta_trader:
+            await query.edit_message_text(
+                "❌ MetaTrader not available",
+                reply_markup=back_button("positions")
+            )
+            return
+        return await method(self, query, *args, **kwargs)
+    return wrapper
+
 
 class ActionManager:
     """Manages trade operations and action callbacks"""
 
-    def __init__(self, meta_trader, user_states: dict, db_manager=None):
+    def __init__(self, meta_trader, user_states: UserStateStore, db_manager=None):
         self.meta_trader = meta_trader
         self.user_states = user_states
         self.db_manager = db_manager
+        self._fallback_db = Migrations.db_manager
+        self._close_dispatch = {
+            "full": self._close_full,
+            "half": self._close_half,
+            "risk_free": self._close_risk_free,
+            "lot": self._show_lot_buttons,
+            "custom": self._prompt_custom_lot,
+        }
 
     # State constants
     STATE_AWAITING_LOT = "awaiting_lot"
     STATE_AWAITING_SL = "awaiting_sl"
     STATE_AWAITING_TP = "awaiting_tp"
 
+    # Maximum number of preset lot buttons in the partial close keyboard
+    LOT_BUTTON_COUNT = 20
+
+    def _ensure_state(self, user_id: int) -> UserState:
+        """User's state, recreated if the session expired from the store"""
+        try:
+            return self.user_states[user_id]
+        except KeyError:
+            user_state = self.user_states[user_id] = UserState()
+            return user_state
+
     async def handle_close_action(self, query, user_id: int, identifier: int, close_type: str) -> None:
         """Handle close actions - close positions, half positions, or set risk-free"""
         try:
-            logger.info(f"Handle close action: identifier={identifier}, close_type={close_type}")
-            if close_type == "full":
-                # Close full position(s)
-                await query.answer("Closing position(s)...", show_alert=False)
-                if self.meta_trader:
-                    # Check if identifier is a signal_id or ticket
-                    # Try to get positions from signal first
-                    from Database import Migrations
-                    db_manager = Migrations.db_manager
-                    position_repo = db_manager.get_position_repository()
-                    
-                    # Get all positions linked to this signal
-                    signal_positions = position_repo.get_positions_by_signal_id(identifier)
-                    
-                    if signal_positions:
-                        # It's a signal_id, close all linked positions
-                        total = len(signal_positions)
-                        closed_count = 0
-                        failed_count = 0
-                        
-                        # Show initial loading message
-                        await query.edit_message_text(f"⏳ Closing {total} position(s)...\n\n🔄 Please wait...")
-                        
-                        for idx, pos in enumerate(signal_positions, 1):
-                            pos_ticket = pos.position_id if hasattr(pos, 'position_id') else pos.get("position_id")
-                            
-                            # Update progress message
-                            await query.edit_message_text(
-                                f"⏳ Processing {idx}/{total}\n"
-                                f"🎟️ Ticket: {pos_ticket}\n\n"
-                                f"✅ Closed: {closed_count}\n"
-                                f"❌ Failed: {failed_count}"
-                            )
-                            
-                            if self.meta_trader.close_position(pos_ticket):
-                                closed_count += 1
-                            else:
-                                failed_count += 1
-                                logger.error(f"Failed to close position {pos_ticket} for signal {identifier}")
-                        
-                        # Show final results
-                        if failed_count == 0:
-                            await query.edit_message_text(
-                                f"✅ Success!\n\n📊 Results:\n"
-                                f"✅ Closed: {closed_count}/{total}",
-                                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                            )
-                        else:
-                            await query.edit_message_text(
-                                f"⚠️ Completed with errors\n\n📊 Results:\n"
-                                f"✅ Closed: {closed_count}/{total}\n"
-                                f"❌ Failed: {failed_count}/{total}\n\n"
-                                f"💡 Check logs for details",
-                                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                            )
-                    else:
-                        # Try as a direct position ticket
-                        await query.edit_message_text("⏳ Closing position...\n\n🔄 Please wait...")
-                        result = self.meta_trader.close_position(identifier)
-                        if result:
-                            await query.edit_message_text(
-                                "✅ Position closed successfully",
-                                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                            )
-                        else:
-                            logger.error(f"Failed to close position {identifier}")
-                            await query.edit_message_text(
-                                "❌ Failed to close position",
-                                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                            )
-                else:
-                    await query.edit_message_text(
-                        "❌ MetaTrader not available",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                    )
-            elif close_type == "half":
-                # Close half position
-                await query.answer("Closing half position...", show_alert=False)
-                if self.meta_trader:
-                    await query.edit_message_text(f"⏳ Closing half position...\n\n🔄 Please wait...")
-                    result = self.meta_trader.close_half_position(identifier)
-                    if result:
-                        await query.edit_message_text(
-                            "✅ Half position closed successfully",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                        )
-                    else:
-                        logger.error(f"Failed to close half position {identifier}")
-                        await query.edit_message_text(
-                            "❌ Failed to close half position",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                        )
-                else:
-                    await query.edit_message_text(
-                        "❌ MetaTrader not available",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                    )
-            elif close_type == "risk_free":
-                # Set risk-free position using signal_id
-                await query.answer("Setting risk-free...", show_alert=False)
-                if self.meta_trader:
-                    await query.edit_message_text("⏳ Setting risk-free...\n\n🔄 Please wait...")
-                    try:
-                        signal_id = self.user_states[user_id].get("context", {}).get("signal_id")
-                        if signal_id:
-                            self.meta_trader.RiskFreeSignal(signal_id)
-                            await query.edit_message_text(
-                                "✅ Position set to risk-free",
-                                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                            )
-                        else:
-                            await query.edit_message_text(
-                                "❌ Signal ID not found",
-                                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                            )
-                    except Exception as e:
-                        logger.error(f"Exception setting risk-free for position {identifier}: {str(e)}")
-                        await query.edit_message_text(
-                            f"❌ Error setting risk-free:\n{str(e)}",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                        )
-                else:
-                    await query.edit_message_text(
-                        "❌ MetaTrader not available",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                    )
-            elif close_type == "lot":
-                # Get position or order lot size and create dynamic buttons
-                if not self.meta_trader:
-                    await query.answer("❌ MetaTrader not available", show_alert=True)
-                    return
-
-                # Get position or order by ticket
-                position_or_order = self.meta_trader.get_position_or_order(identifier)
-                if not position_or_order:
-                    await query.answer("❌ Position/Order not found", show_alert=True)
-                    return
-
-                current_lot = position_or_order.volume
-                
-                # If lot is exactly 0.01, just show close button
-                if current_lot <= 0.01:
-                    await query.edit_message_text(
-                        f"📊 Current lot: {current_lot}\n\n⚠️ Lot size is at minimum (0.01). Close the entire position?",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("❌ Close Position", callback_data=f"close_full_{identifier}")]])
-                    )
-                    return
+            _info("Handle close action: identifier={}, close_type={}", identifier, close_type)
+            handler = self._close_dispatch.get(close_type)
+            if not handler:
+                _warning("Unknown close type: {}", close_type)
+                return
+            await handler(query, user_id, identifier)
 
-                # Generate lot buttons from current_lot - 0.01 down to 0.01
-                lot_buttons = []
-                current = round(current_lot - 0.01, 2)
-                
-                # Create rows of 4 buttons each
-                row = []
-                while current >= 0.01:
-                    # Use dash instead of underscore for lot size to avoid split() issues with decimals
-                    row.append(InlineKeyboardButton(str(current), callback_data=f"close_lot_{identifier}-{current}"))
-                    if len(row) == 4:
-                        lot_buttons.append(row)
-                        row = []
-                    current = round(current - 0.01, 2)
-                
-                # Add remaining buttons
-                if row:
-                    lot_buttons.append(row)
-                
-                # Add back button
-                lot_buttons.append([InlineKeyboardButton("⬅️ Back", callback_data="positions")])
+        except Exception as e:
+            _error("Error in close action: {}", e, exc_info=True)
+            await query.answer(f"Error: {str(e)}", show_alert=True)
 
-                self.user_states[user_id]["state"] = self.STATE_AWAITING_LOT
-                self.user_states[user_id]["context"]["identifier"] = identifier
-                
+    @_requires_mt
+    async def _close_full(self, query, user_id: int, identifier: int) -> None:
+        """Close full position(s) for a signal_id or a direct ticket"""
+        await query.answer("Closing position(s)...", show_alert=False)
+        # Check if identifier is a signal_id or ticket
+        # Try to get positions from signal first
+        db_manager = self.db_manager or self._fallback_db
+        position_repo = db_manager.get_position_repository()
+
+        # Get all positions linked to this signal
+        signal_positions = position_repo.get_positions_by_signal_id(identifier)
+
+        if signal_positions:
+            # It's a signal_id, close all linked positions
+            total = len(signal_positions)
+            closed_count = 0
+            failed_count = 0
+
+            # Show initial loading message
+            await query.edit_message_text(f"⏳ Closing {total} position(s)...\n\n🔄 Please wait...")
+
+            for idx, pos in enumerate(signal_positions, 1):
+                pos_ticket = pos.position_id if hasattr(pos, 'position_id') else pos.get("position_id")
+
+                # Update progress message
+                await query.edit_message_text(
+                    f"⏳ Processing {idx}/{total}\n"
+                    f"🎟️ Ticket: {pos_ticket}\n\n"
+                    f"✅ Closed: {closed_count}\n"
+                    f"❌ Failed: {failed_count}"
+                )
+
+                if await run_mt(self.meta_trader.close_position, pos_ticket):
+                    closed_count += 1
+                else:
+                    failed_count += 1
+                    _error("Failed to close position {} for signal {}", pos_ticket, identifier)
+
+            # Show final results
+            if failed_count == 0:
+                await query.edit_message_text(
+                    f"✅ Success!\n\n📊 Results:\n"
+                    f"✅ Closed: {closed_count}/{total}",
+                    reply_markup=back_button("positions")
+                )
+            else:
+                await query.edit_message_text(
+                    f"⚠️ Completed with errors\n\n📊 Results:\n"
+                    f"✅ Closed: {closed_count}/{total}\n"
+                    f"❌ Failed: {failed_count}/{total}\n\n"
+                    f"💡 Check logs for details",
+                    reply_markup=back_button("positions")
+                )
+        else:
+            # Try as a direct position ticket
+            await query.edit_message_text("⏳ Closing position...\n\n🔄 Please wait...")
+            result = await run_mt(self.meta_trader.close_position, identifier)
+            if result:
+                await query.edit_message_text(
+                    "✅ Position closed successfully",
+                    reply_markup=back_button("positions")
+                )
+            else:
+                _error("Failed to close position {}", identifier)
                 await query.edit_message_text(
-                    f"📊 Current lot size: {current_lot}\n\n📝 Select lot size to close (0.01 to {round(current_lot - 0.01, 2)}):",
-                    reply_markup=InlineKeyboardMarkup(lot_buttons)
+                    "❌ Failed to close position",
+                    reply_markup=back_button("positions")
                 )
 
+    @_requires_mt
+    async def _close_half(self, query, user_id: int, identifier: int) -> None:
+        """Close half of a position"""
+        await query.answer("Closing half position...", show_alert=False)
+        await query.edit_message_text(f"⏳ Closing half position...\n\n🔄 Please wait...")
+        result = await run_mt(self.meta_trader.close_half_position, identifier)
+        if result:
+            await query.edit_message_text(
+                "✅ Half position closed successfully",
+                reply_markup=back_button("positions")
+            )
+        else:
+            _error("Failed to close half position {}", identifier)
+            await query.edit_message_text(
+                "❌ Failed to close half position",
+                reply_markup=back_button("positions")
+            )
+
+    @_requires_mt
+    async def _close_risk_free(self, query, user_id: int, identifier: int) -> None:
+        """Set risk-free position using signal_id"""
+        await query.answer("Setting risk-free...", show_alert=False)
+        await query.edit_message_text("⏳ Setting risk-free...\n\n🔄 Please wait...")
+        try:
+            user_state = self.user_states.get(user_id)
+            signal_id = user_state.context.get("signal_id") if user_state else None
+            if signal_id:
+                await run_mt(self.meta_trader.RiskFreeSignal, signal_id)
+                await query.edit_message_text(
+                    "✅ Position set to risk-free",
+                    reply_markup=back_button("positions")
+                )
+            else:
+                await query.edit_message_text(
+                    "❌ Signal ID not found",
+                    reply_markup=back_button("positions")
+                )
         except Exception as e:
-            logger.error(f"Error in close action: {e}", exc_info=True)
-            await query.answer(f"Error: {str(e)}", show_alert=True)
+            _error("Exception setting risk-free for position {}: {}", identifier, str(e))
+            await query.edit_message_text(
+                f"❌ Error setting risk-free:\n{str(e)}",
+                reply_markup=back_button("positions")
+            )
+
+    @_requires_mt
+    async def _show_lot_buttons(self, query, user_id: int, identifier: int) -> None:
+        """Show lot size buttons for a partial close"""
+        # Get position or order by ticket
+        position_or_order = await run_mt(self.meta_trader.get_position_or_order, identifier)
+        if not position_or_order:
+            await query.answer("❌ Position/Order not found", show_alert=True)
+            return
+
+        current_lot = position_or_order.volume
+
+        # If lot is exactly 0.01, just show close button
+        if current_lot <= 0.01:
+            await query.edit_message_text(
+                f"📊 Current lot: {current_lot}\n\n⚠️ Lot size is at minimum (0.01). Close the entire position?",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("❌ Close Position", callback_data=f"close_{identifier}_full")]])
+            )
+            return
+
+        # Generate at most LOT_BUTTON_COUNT evenly spaced lot sizes below current_lot
+        step = max(0.01, round(current_lot / self.LOT_BUTTON_COUNT, 2))
+        values = sorted(
+            {round(step * i, 2) for i in range(1, self.LOT_BUTTON_COUNT + 1) if round(step * i, 2) < current_lot},
+            reverse=True
+        )
+
+        # Create rows of 4 buttons each
+        # Use dash instead of underscore for lot size to avoid split() issues with decimals
+        lot_buttons = [
+            [InlineKeyboardButton(str(lot), callback_data=f"close_lot_{identifier}-{lot}") for lot in values[i:i + 4]]
+            for i in range(0, len(values), 4)
+        ]
+
+        # Free-form lot size for anything between the preset steps
+        lot_buttons.append([InlineKeyboardButton("✏️ Custom", callback_data=f"close_{identifier}_custom")])
+        # Add back button
+        lot_buttons.append([InlineKeyboardButton("⬅️ Back", callback_data="positions")])
+
+        user_state = self._ensure_state(user_id)
+        user_state.state = self.STATE_AWAITING_LOT
+        user_state.context["identifier"] = identifier
+
+        await query.edit_message_text(
+            f"📊 Current lot size: {current_lot}\n\n📝 Select lot size to close (0.01 to {round(current_lot - 0.01, 2)}):",
+            reply_markup=InlineKeyboardMarkup(lot_buttons)
+        )
+
+    async def _prompt_custom_lot(self, query, user_id: int, identifier: int) -> None:
+        """Ask for a free-form lot size; the reply is handled by InputHandler.handle_lot_input"""
+        user_state = self._ensure_state(user_id)
+        user_state.state = self.STATE_AWAITING_LOT
+        user_state.context["identifier"] = identifier
+
+        await query.edit_message_text(
+            "📝 Send lot size to close (e.g., 0.5):",
+            reply_markup=back_button("positions")
+        )
 
     async def handle_update_action(self, query, user_id: int, identifier: int, update_type: str) -> None:
         """Handle update SL/TP - show current values and options"""
@@ -228,9 +274,9 @@ class ActionManager:
                     ticket = db_positions[0].position_id if hasattr(db_positions[0], 'position_id') else db_positions[0].get("position_id")
             
             try:
-                position_or_order = self.meta_trader.get_position_or_order(ticket)
+                position_or_order = await run_mt(self.meta_trader.get_position_or_order, ticket)
             except Exception as e:
-                logger.error(f"Error getting position/order for ticket {ticket}: {e}", exc_info=True)
+                _error("Error getting position/order for ticket {}: {}", ticket, e, exc_info=True)
                 await query.answer(f"❌ Error: {str(e)}", show_alert=True)
                 return
             
@@ -240,32 +286,26 @@ class ActionManager:
             
             if update_type == "sl":
                 current_sl = position_or_order.sl if hasattr(position_or_order, 'sl') else position_or_order.get("sl", "N/A")
-                if user_id not in self.user_states:
-                    self.user_states[user_id] = {}
-                if "context" not in self.user_states[user_id]:
-                    self.user_states[user_id]["context"] = {}
-                self.user_states[user_id]["state"] = self.STATE_AWAITING_SL
-                self.user_states[user_id]["context"]["identifier"] = ticket  # Store actual ticket
-                self.user_states[user_id]["context"]["signal_id"] = identifier  # Also store signal ID for back button
+                user_state = self._ensure_state(user_id)
+                user_state.state = self.STATE_AWAITING_SL
+                user_state.context["identifier"] = ticket  # Store actual ticket
+                user_state.context["signal_id"] = identifier  # Also store signal ID for back button
                 await query.edit_message_text(
                     f"📊 Current Stop Loss: {current_sl}\n\n📝 Send new Stop Loss value:",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{identifier}")]])
+                    reply_markup=back_button(f"signal_{identifier}")
                 )
             elif update_type == "tp":
                 current_tp = position_or_order.tp if hasattr(position_or_order, 'tp') else position_or_order.get("tp", "N/A")
-                if user_id not in self.user_states:
-                    self.user_states[user_id] = {}
-                if "context" not in self.user_states[user_id]:
-                    self.user_states[user_id]["context"] = {}
-                self.user_states[user_id]["state"] = self.STATE_AWAITING_TP
-                self.user_states[user_id]["context"]["identifier"] = ticket  # Store actual ticket
-                self.user_states[user_id]["context"]["signal_id"] = identifier  # Also store signal ID for back button
+                user_state = self._ensure_state(user_id)
+                user_state.state = self.STATE_AWAITING_TP
+                user_state.context["identifier"] = ticket  # Store actual ticket
+                user_state.context["signal_id"] = identifier  # Also store signal ID for back button
                 await query.edit_message_text(
                     f"📊 Current Take Profit: {current_tp}\n\n📝 Send new Take Profit value:",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{identifier}")]])
+                    reply_markup=back_button(f"signal_{identifier}")
                 )
         except Exception as e:
-            logger.error(f"Error in update action for position {identifier}: {e}", exc_info=True)
+            _error("Error in update action for position {}: {}", identifier, e, exc_info=True)
             await query.answer(f"Error: {str(e)}", show_alert=True)
 
     async def handle_delete_order(self, query, user_id: int, ticket: int) -> None:
@@ -274,60 +314,60 @@ class ActionManager:
             await query.answer("Deleting order...", show_alert=False)
             if self.meta_trader:
                 await query.edit_message_text(f"⏳ Deleting order {ticket}...\n\n🔄 Please wait...")
-                result = self.meta_trader.delete_order(ticket)
+                result = await run_mt(self.meta_trader.delete_order, ticket)
                 if result:
-                    logger.info(f"Successfully deleted order {ticket}")
+                    _info("Successfully deleted order {}", ticket)
                     await query.edit_message_text(
                         "✅ Order deleted successfully",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                        reply_markup=back_button("positions")
                     )
                 else:
-                    logger.error(f"Failed to delete order {ticket}")
+                    _error("Failed to delete order {}", ticket)
                     await query.edit_message_text(
                         "❌ Delete failed (check logs)",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                        reply_markup=back_button("positions")
                     )
             else:
                 await query.edit_message_text(
                     "❌ MetaTrader not available",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                    reply_markup=back_button("positions")
                 )
         except Exception as e:
-            logger.error(f"Error deleting order {ticket}: {e}")
+            _error("Error deleting order {}: {}", ticket, e)
             await query.answer(f"Error: {str(e)}", show_alert=True)
 
     async def handle_close_custom_lot(self, query, user_id: int, identifier: int, lot_size: float) -> None:
         """Handle closing custom lot size from inline button"""
         try:
-            logger.info(f"Handling close custom lot: identifier={identifier}, lot_size={lot_size}")
+            _info("Handling close custom lot: identifier={}, lot_size={}", identifier, lot_size)
             await query.answer(f"Closing {lot_size} lots...", show_alert=False)
             if self.meta_trader:
                 await query.edit_message_text(f"⏳ Closing {lot_size} lots...\n\n🔄 Please wait...")
                 try:
-                    result = self.meta_trader.close_custom_lot(identifier, lot_size)
+                    result = await run_mt(self.meta_trader.close_custom_lot, identifier, lot_size)
                     if result:
-                        logger.info(f"Successfully closed {lot_size} lots for position {identifier}")
+                        _info("Successfully closed {} lots for position {}", lot_size, identifier)
                         await query.edit_message_text(
                             f"✅ Successfully closed {lot_size} lots",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                            reply_markup=back_button("positions")
                         )
                     else:
-                        logger.error(f"Failed to close {lot_size} lots for position {identifier}")
+                        _error("Failed to close {} lots for position {}", lot_size, identifier)
                         await query.edit_message_text(
                             f"❌ Failed to close {lot_size} lots (check logs)",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                            reply_markup=back_button("positions")
                         )
                 except Exception as e:
-                    logger.error(f"Exception closing {lot_size} lots for position {identifier}: {str(e)}")
+                    _error("Exception closing {} lots for position {}: {}", lot_size, identifier, str(e))
                     await query.edit_message_text(
                         f"❌ Error closing lot:\n{str(e)}",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                        reply_markup=back_button("positions")
                     )
             else:
                 await query.edit_message_text(
                     "❌ MetaTrader not available",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                    reply_markup=back_button("positions")
                 )
         except Exception as e:
-            logger.error(f"Error closing {lot_size} lots for position {identifier}: {e}")
+            _error("Error closing {} lots for position {}: {}", lot_size, identifier, e)
             await query.answer(f"Error: {str(e)}", show_alert=True)
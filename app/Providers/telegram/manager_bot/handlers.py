@@ -2,19 +2,169 @@
 Command and callback handlers for user interactions
 """
 
+import asyncio
+import re
+from datetime import datetime
+from functools import partial
+from typing import Dict, Final
+
 from loguru import logger
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
+from .helpers import back_button
+from .state import UserState, UserStateStore
+
+# Compound callback route keys: the action prefix, or "{action}_{first token}" for sub-routes
+_CB_SIGNAL: Final = "signal"
+_CB_POSITION: Final = "position"
+_CB_CLOSE: Final = "close"
+_CB_CLOSE_LOT: Final = "close_lot"
+_CB_UPDATE: Final = "update"
+_CB_DELETE: Final = "delete"
+_CB_MANAGE: Final = "manage"
+_CB_HISTORY_DETAIL: Final = "history_detail"
+_CB_CAL_PREV: Final = "cal_prev"
+_CB_CAL_NEXT: Final = "cal_next"
+_CB_CAL_DAY: Final = "cal_day"
+_CB_ANALYZE_DETAIL: Final = "analyze_detail"
+
+
+class CallbackError(Exception):
+    """Expected callback failure whose message is safe to show to the user"""
+
+
+def _to_int(value: str) -> int:
+    """Plain non-negative integer (int() alone would also accept '1_000' or ' 7')"""
+    if not value.isdigit():
+        raise ValueError(f"not an integer: {value!r}")
+    return int(value)
+
+
+def _to_float(value: str) -> float:
+    """Plain non-negative decimal such as '0.05'"""
+    if not value.replace(".", "", 1).isdigit():
+        raise ValueError(f"not a decimal: {value!r}")
+    return float(value)
+
+
+# Argument schema per route key: (separator, argument parsers)
+_SCHEMAS: Final = {
+    _CB_SIGNAL: ("_", (_to_int,)),
+    _CB_POSITION: ("_", (_to_int,)),
+    _CB_DELETE: ("_", (_to_int,)),
+    _CB_CLOSE: ("_", (_to_int, str)),                       # close_{id}_{type}
+    _CB_CLOSE_LOT: ("-", (_to_int, _to_float)),             # close_lot_{identifier}-{lot_size}
+    _CB_UPDATE: ("_", (_to_int, str)),                      # update_{id}_{sl|tp}
+    _CB_MANAGE: ("_", (_to_int, str)),                      # manage_{id}_{open|second}
+    _CB_HISTORY_DETAIL: ("_", (_to_int,)),                  # history_detail_{index}
+    _CB_ANALYZE_DETAIL: ("_", (_to_int,)),                  # analyze_detail_{channel_idx}
+}
+
+# Calendar selection modes
+_CAL_FROM: Final = "from"
+_CAL_TO: Final = "to"
+
+# cal_prev/cal_next_{year}_{month}_{mode} and cal_day_{year}_{month}_{day}_{mode} in one match
+_CAL_RE: Final = re.compile(r"cal_(prev|next|day)_(\d+)_(\d+)(?:_(\d+))?(?:_(from|to))?", re.ASCII)
+
+
+def _parse_callback(callback_data: str):
+    """Split compound callback data into (route key, typed args)
+
+    Returns None for an unknown route; raises CallbackError when a known route's
+    arguments do not fit its schema.
+    """
+    if callback_data.startswith("cal_"):
+        return _parse_calendar_callback(callback_data)
+    action, _, rest = callback_data.partition("_")
+    first, _, tail = rest.partition("_")
+    key = f"{action}_{first}"
+    if key in _SCHEMAS:
+        rest = tail
+    else:
+        key = action
+    schema = _SCHEMAS.get(key)
+    if schema is None:
+        return None
+
+    separator, parsers = schema
+    if len(parsers) == 2:
+        # e.g. close_lot's "{identifier}-{lot_size}": partition, no list
+        head, sep, tail = rest.partition(separator)
+        if not sep:
+            raise CallbackError("Invalid action")
+        fields = (head, tail)
+    else:
+        fields = rest.split(separator, len(parsers) - 1)
+    if len(fields) != len(parsers) or not all(fields):
+        raise CallbackError("Invalid action")
+    try:
+        return key, tuple(parse(field) for parse, field in zip(parsers, fields))
+    except ValueError as e:
+        raise CallbackError("Invalid action") from e
+
+
+def _parse_calendar_callback(callback_data: str):
+    """Calendar navigation/day callbacks via _CAL_RE; mode defaults to 'from'"""
+    match = _CAL_RE.fullmatch(callback_data)
+    if match is None:
+        raise CallbackError("Invalid action")
+    kind, year, month, day, mode = match.groups()
+    mode = mode or _CAL_FROM
+    if kind == "day":
+        if day is None:
+            raise CallbackError("Invalid action")
+        return _CB_CAL_DAY, (int(year), int(month), int(day), mode)
+    if day is not None:
+        raise CallbackError("Invalid action")
+    return (_CB_CAL_PREV if kind == "prev" else _CB_CAL_NEXT), (int(year), int(month), mode)
+
 
 class HandlerManager:
     """Manages command and callback handlers"""
 
-    def __init__(self, views, actions, input_handler, user_states: dict):
+    __slots__ = (
+        "views", "actions", "input_handler", "user_states",
+        "_user_queues", "_user_workers", "_state_dispatch",
+        "_main_menu_text", "_main_menu_markup",
+    )
+
+    def __init__(self, views, actions, input_handler, user_states: UserStateStore):
         self.views = views
         self.actions = actions
         self.input_handler = input_handler
         self.user_states = user_states
+        # Per-user serial callback queues: different users run concurrently, one user's taps run in order
+        self._user_queues: Dict[int, asyncio.Queue] = {}
+        self._user_workers: Dict[int, asyncio.Task] = {}
+
+        # Text input routing by current user state
+        self._state_dispatch = {
+            self.STATE_AWAITING_LOT: self.input_handler.handle_lot_input,
+            self.STATE_AWAITING_SL: self.input_handler.handle_sl_input,
+            self.STATE_AWAITING_TP: self.input_handler.handle_tp_input,
+            self.STATE_AWAITING_TRADE_INPUT: self.input_handler.handle_trade_input,
+            self.STATE_TESTER: self.input_handler.handle_tester_input,
+        }
+
+        # Static default-menu keyboard, built once and reused for every reply
+        self._main_menu_text = "👋 **Signal Trader Bot Menu**\n\nSelect an option:"
+        self._main_menu_markup = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("📊 Active Signals", callback_data="signals"),
+                InlineKeyboardButton("📈 Active Positions", callback_data="positions"),
+            ],
+            [
+                InlineKeyboardButton("🔄 New Trade", callback_data="open_trade"),
+                InlineKeyboardButton("🧪 Signal Tester", callback_data="tester"),
+            ],
+            [
+                InlineKeyboardButton("💼 Trade Summary", callback_data="trade"),
+                InlineKeyboardButton("📜 History", callback_data="history"),
+            ],
+        ])
 
     # State constants
     STATE_MAIN_MENU = "main_menu"
@@ -22,326 +172,301 @@ class HandlerManager:
     STATE_AWAITING_SL = "awaiting_sl"
     STATE_AWAITING_TP = "awaiting_tp"
     STATE_TESTER = "tester"
+    STATE_AWAITING_TRADE_INPUT = "awaiting_trade_input"
+
+    # Seconds a per-user worker waits for new work before exiting
+    USER_WORKER_IDLE_TIMEOUT = 60
+
+    # Callbacks that map directly to a view: {callback_data: handler(self, query, user_id)}
+    _SINGLE_HANDLERS = {
+        "menu": lambda self, q, u: self.views.show_account_details_from_callback(q, u),
+        "signals": lambda self, q, u: self.views.show_signal_list(q, u),
+        "open_trade": lambda self, q, u: self.views.show_open_trade_form(q, u),
+        "positions": lambda self, q, u: self.views.show_position_list(q, u),
+        "tester": lambda self, q, u: self.views.show_tester(q, u),
+        "trade": lambda self, q, u: self.views.show_trade_summary(q, u),
+        "history": lambda self, q, u: self.views.show_history_menu(q, u),
+        "history_today": lambda self, q, u: self.views.show_history_results(q, u, "today"),
+        "history_yesterday": lambda self, q, u: self.views.show_history_results(q, u, "yesterday"),
+        "history_calendar": lambda self, q, u: self.views.show_history_calendar(q, u),
+        "analyze": lambda self, q, u: self.views.show_analyze_menu(q, u),
+        "analyze_all": lambda self, q, u: self.views.show_channel_list(q, u, "all"),
+        "analyze_week": lambda self, q, u: self.views.show_channel_list(q, u, "week"),
+        "analyze_month": lambda self, q, u: self.views.show_channel_list(q, u, "month"),
+        "analyze_30days": lambda self, q, u: self.views.show_channel_list(q, u, "30days"),
+        "history_calendar_reset": lambda self, q, u: self._history_calendar_reset(q, u),
+        "history_custom_view": lambda self, q, u: self._history_custom_view(q, u),
+        "history_back": lambda self, q, u: self._history_back(q, u),
+        "history_page_next": lambda self, q, u: self._history_page(q, u, 1),
+        "history_page_prev": lambda self, q, u: self._history_page(q, u, -1),
+        "cal_noop": lambda self, q, u: asyncio.sleep(0),  # No operation for calendar headers
+    }
 
     async def handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command - Show account details and main menu"""
         try:
             user_id = update.effective_user.id
-            self.user_states[user_id] = {
-                "state": self.STATE_MAIN_MENU, "context": {}}
+            self.user_states[user_id] = UserState(self.STATE_MAIN_MENU)
 
             # Show account details and main menu
             await self.views.show_account_details(update, user_id)
         except Exception as e:
-            logger.error(f"Error handling start: {e}")
+            logger.error("Error handling start: {}", e)
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle inline button callbacks - routes to appropriate view or action"""
-        try:
-            query = update.callback_query
-            user_id = query.from_user.id
-            callback_data = query.data
-            await query.answer()
+        query = update.callback_query
+        user_id = query.from_user.id
+        callback_data = query.data
 
-            logger.info(f"Callback received: {callback_data}")
+        logger.info("Callback received: {}", callback_data)
 
-            # Handle single-word callbacks first (before splitting)
-            if callback_data == "menu":
-                # Show account details as main menu
-                await self.views.show_account_details_from_callback(query, user_id)
-                return
-            elif callback_data == "signals":
-                await self.views.show_signal_list(query, user_id)
-                return
-            elif callback_data == "open_trade":
-                await self.views.show_open_trade_form(query, user_id)
-                return
-            elif callback_data == "positions":
-                await self.views.show_position_list(query, user_id)
-                return
-            elif callback_data == "tester":
-                await self.views.show_tester(query, user_id)
-                return
-            elif callback_data == "trade":
-                await self.views.show_trade_summary(query, user_id)
-                return
-            elif callback_data == "history":
-                await self.views.show_history_menu(query, user_id)
-                return
-            elif callback_data == "history_today":
-                await self.views.show_history_results(query, user_id, "today")
-                return
-            elif callback_data == "history_yesterday":
-                await self.views.show_history_results(query, user_id, "yesterday")
-                return
-            elif callback_data == "history_calendar":
-                await self.views.show_history_calendar(query, user_id)
-                return
-            elif callback_data == "history_calendar_reset":
-                # Reset calendar selection
-                if user_id in self.user_states and "context" in self.user_states[user_id]:
-                    self.user_states[user_id]["context"].pop("from_date", None)
-                    self.user_states[user_id]["context"].pop("to_date", None)
-                await self.views.show_history_calendar(query, user_id)
-                return
-            elif callback_data == "history_custom_view":
-                # View custom date range
-                if user_id in self.user_states and "context" in self.user_states[user_id]:
-                    from_date = self.user_states[user_id]["context"].get("from_date")
-                    to_date = self.user_states[user_id]["context"].get("to_date")
-                    if from_date and to_date:
-                        await self.views.show_history_results(query, user_id, "custom", from_date, to_date)
-                    else:
-                        await query.answer("Please select both start and end dates", show_alert=True)
-                return
-            elif callback_data == "history_back":
-                # Go back to history results using stored context
-                if user_id in self.user_states and "context" in self.user_states[user_id]:
-                    context = self.user_states[user_id]["context"]
-                    range_type = context.get("history_range_type", "today")
-                    from_date = context.get("from_date")
-                    to_date = context.get("to_date")
-
-                    if range_type == "custom" and from_date and to_date:
-                        await self.views.show_history_results(query, user_id, "custom", from_date, to_date)
-                    else:
-                        await self.views.show_history_results(query, user_id, range_type)
-                else:
-                    await self.views.show_history_menu(query, user_id)
-                return
-            elif callback_data == "cal_noop":
-                # No operation for calendar headers
-                await query.answer()
-                return
-            elif callback_data == "history_page_next":
-                # Go to next page
-                if user_id in self.user_states and "context" in self.user_states[user_id]:
-                    context = self.user_states[user_id]["context"]
-                    current_page = context.get("history_page", 0)
-                    context["history_page"] = current_page + 1
-
-                    range_type = context.get("history_range_type", "today")
-                    from_date = context.get("from_date")
-                    to_date = context.get("to_date")
-
-                    if range_type == "custom" and from_date and to_date:
-                        await self.views.show_history_results(query, user_id, "custom", from_date, to_date)
-                    else:
-                        await self.views.show_history_results(query, user_id, range_type)
-                return
-            elif callback_data == "history_page_prev":
-                # Go to previous page
-                if user_id in self.user_states and "context" in self.user_states[user_id]:
-                    context = self.user_states[user_id]["context"]
-                    current_page = context.get("history_page", 0)
-                    context["history_page"] = max(0, current_page - 1)
-
-                    range_type = context.get("history_range_type", "today")
-                    from_date = context.get("from_date")
-                    to_date = context.get("to_date")
-
-                    if range_type == "custom" and from_date and to_date:
-                        await self.views.show_history_results(query, user_id, "custom", from_date, to_date)
-                    else:
-                        await self.views.show_history_results(query, user_id, range_type)
-                return
-            elif callback_data == "analyze":
-                await self.views.show_analyze_menu(query, user_id)
-                return
-            elif callback_data == "analyze_all":
-                await self.views.show_channel_list(query, user_id, "all")
-                return
-            elif callback_data == "analyze_week":
-                await self.views.show_channel_list(query, user_id, "week")
-                return
-            elif callback_data == "analyze_month":
-                await self.views.show_channel_list(query, user_id, "month")
+        # Handle single-word callbacks first, then typed compound callbacks
+        handler = self._SINGLE_HANDLERS.get(callback_data)
+        if handler:
+            args = (self, query, user_id)
+        else:
+            try:
+                parsed = _parse_callback(callback_data)
+            except CallbackError as e:
+                logger.warning("Malformed callback data {}: {}", callback_data, e.__cause__ or e)
+                await self._answer_quietly(query, str(e), show_alert=True)
                 return
-            elif callback_data == "analyze_30days":
-                await self.views.show_channel_list(query, user_id, "30days")
+            handler = self._ACTION_HANDLERS.get(parsed[0]) if parsed else None
+            if not handler:
+                logger.warning("Invalid callback data: {}", callback_data)
+                await self._answer_quietly(query, "Invalid action", show_alert=True)
                 return
+            key, typed_args = parsed
+            logger.info("Parsed callback - route: {}, args: {}", key, typed_args)
+            args = (self, query, user_id, *typed_args)
 
-            # Now handle compound callbacks that need splitting
-            parts = callback_data.split("_")
-            action = parts[0]
-            
-            logger.info(f"Parsed callback - action: {action}, parts: {parts}")
-
-            # Check for close_lot BEFORE close to avoid parsing conflict
-            # close_lot has format: close_lot_{identifier}-{lot_size}
-            if len(parts) >= 3 and parts[0] == "close" and parts[1] == "lot":
-                identifier_lot = parts[2]
-                if '-' in identifier_lot:
-                    identifier_str, lot_str = identifier_lot.split('-', 1)
-                    try:
-                        identifier = int(identifier_str)
-                        lot_size = float(lot_str)
-                        logger.info(f"Close lot callback: identifier={identifier}, lot_size={lot_size}")
-                        await self.actions.handle_close_custom_lot(query, user_id, identifier, lot_size)
-                    except (ValueError, IndexError) as e:
-                        logger.error(f"Invalid close_lot format: {callback_data}, error: {e}")
-                        await query.answer("Invalid lot format", show_alert=True)
-                else:
-                    logger.error(f"Invalid close_lot format (no dash): {callback_data}")
-                    await query.answer("Invalid lot format", show_alert=True)
-            elif action == "signal":
-                signal_id = int(parts[1])
-                await self.views.show_signal_detail(query, user_id, signal_id)
-            elif action == "position":
-                ticket = int(parts[1])
-                await self.views.show_position_detail(query, user_id, ticket)
-            elif action == "close":
-                identifier = int(parts[1])
-                close_type = "_".join(parts[2:])
-                await self.actions.handle_close_action(query, user_id, identifier, close_type)
-            elif action == "update":
-                identifier = int(parts[1])
-                update_type = "_".join(parts[2:])
-                await self.actions.handle_update_action(query, user_id, identifier, update_type)
-            elif action == "delete":
-                ticket = int(parts[1])
-                await self.actions.handle_delete_order(query, user_id, ticket)
-            elif action == "manage":
-                signal_id = int(parts[1])
-                entry_type = "_".join(parts[2:])  # "open" or "second"
-                await self.views.show_manage_signal_entries(query, user_id, signal_id, entry_type)
-            elif action == "history" and len(parts) >= 2 and parts[1] == "detail":
-                # history_detail_{index}
-                result_index = int(parts[2])
-                logger.info(f"[HISTORY_HANDLER] User {user_id} viewing history detail for result_index: {result_index}")
-                await self.views.show_history_detail(query, user_id, result_index)
-            elif action == "cal":
-                # Calendar navigation and day selection
-                # Formats: cal_prev_{year}_{month}_{mode}, cal_next_{year}_{month}_{mode}, cal_day_{year}_{month}_{day}_{mode}
-                if len(parts) < 2:
-                    await query.answer("Invalid calendar action", show_alert=True)
-                    return
-
-                cal_action = parts[1]
-
-                if cal_action == "prev":
-                    # Navigate to previous month
-                    year = int(parts[2])
-                    month = int(parts[3])
-                    mode = parts[4] if len(parts) > 4 else "from"
-
-                    # Calculate previous month
-                    if month == 1:
-                        year -= 1
-                        month = 12
-                    else:
-                        month -= 1
-
-                    await self.views.show_history_calendar(query, user_id, year, month, mode)
-
-                elif cal_action == "next":
-                    # Navigate to next month
-                    year = int(parts[2])
-                    month = int(parts[3])
-                    mode = parts[4] if len(parts) > 4 else "from"
-
-                    # Calculate next month
-                    if month == 12:
-                        year += 1
-                        month = 1
-                    else:
-                        month += 1
-
-                    await self.views.show_history_calendar(query, user_id, year, month, mode)
-
-                elif cal_action == "day":
-                    # Select a day
-                    from datetime import datetime
-
-                    year = int(parts[2])
-                    month = int(parts[3])
-                    day = int(parts[4])
-                    mode = parts[5] if len(parts) > 5 else "from"
-
-                    selected_date = datetime(year, month, day)
-
-                    # Store in user context
-                    if user_id not in self.user_states:
-                        self.user_states[user_id] = {}
-                    if "context" not in self.user_states[user_id]:
-                        self.user_states[user_id]["context"] = {}
-
-                    if mode == "from":
-                        self.user_states[user_id]["context"]["from_date"] = selected_date
-                        # Switch to selecting 'to' date
-                        await self.views.show_history_calendar(query, user_id, year, month, "to")
-                    else:  # mode == "to"
-                        from_date = self.user_states[user_id]["context"].get("from_date")
-
-                        # Validate: to_date must be >= from_date
-                        if from_date and selected_date < from_date:
-                            await query.answer("End date must be after start date", show_alert=True)
-                            await self.views.show_history_calendar(query, user_id, year, month, "to")
-                        else:
-                            self.user_states[user_id]["context"]["to_date"] = selected_date
-                            # Show calendar with both dates selected
-                            await self.views.show_history_calendar(query, user_id, year, month, "to")
-
-                else:
-                    await query.answer("Invalid calendar action", show_alert=True)
-            elif action == "analyze" and len(parts) >= 3 and parts[1] == "detail":
-                # Handle analyze_detail_{channel_idx}
-                try:
-                    channel_idx = int(parts[2])
-                    await self.views.show_channel_detail(query, user_id, channel_idx)
-                except (ValueError, IndexError) as e:
-                    logger.error(f"Error parsing analyze_detail callback: {e}")
-                    await query.answer("Invalid channel selection", show_alert=True)
-            else:
-                logger.warning(f"Unknown action: {action} from callback: {callback_data}")
-                await query.answer("Unknown action", show_alert=True)
+        acked = await self._answer_quietly(query)
 
+        # Run the handler on this user's serial queue
+        self._enqueue(user_id, f"callback {callback_data}", partial(self._run_callback, query, acked, handler, *args))
+
+    @staticmethod
+    async def _answer_quietly(query, text: str = None, show_alert: bool = False) -> bool:
+        """Answer a callback query; returns False instead of raising if Telegram rejects it"""
+        try:
+            await query.answer(text, show_alert=show_alert)
+            return True
+        except TelegramError as e:
+            logger.warning("Failed to answer callback {}: {}", query.data, e)
+            return False
+
+    def _enqueue(self, user_id: int, label: str, job) -> None:
+        """Queue a job (no-arg coroutine function) for user_id, starting that user's worker if needed"""
+        queue = self._user_queues.get(user_id)
+        if queue is None:
+            queue = self._user_queues[user_id] = asyncio.Queue()
+        queue.put_nowait((label, job))
+        if user_id not in self._user_workers:
+            self._user_workers[user_id] = asyncio.create_task(self._user_worker(user_id, queue))
+
+    async def _user_worker(self, user_id: int, queue: asyncio.Queue) -> None:
+        """Run one user's callbacks and messages in arrival order; exit after USER_WORKER_IDLE_TIMEOUT idle seconds"""
+        try:
+            while True:
+                try:
+                    label, job = await asyncio.wait_for(queue.get(), self.USER_WORKER_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # wait_for awaits the get()'s cancellation before raising, and
+                    # _enqueue may have queued a job during that await
+                    if not queue.empty():
+                        continue
+                    break
+                try:
+                    await job()
+                except Exception:
+                    # Keep the worker alive for this user's next update
+                    logger.opt(exception=True).error("Unhandled error in {} for user {}", label, user_id)
+        finally:
+            # No await between the empty-queue check and here, so no job is dropped
+            self._user_workers.pop(user_id, None)
+            self._user_queues.pop(user_id, None)
+
+    async def _run_callback(self, query, acked: bool, fn, *args) -> None:
+        """Run a routed callback handler, reporting any failure back to the user"""
+        try:
+            await fn(*args)
+        except CallbackError as e:
+            await self._report_error(query, acked, str(e))
+        except (TelegramError, ValueError) as e:
+            logger.opt(exception=True).error("Error handling callback {}: {}", query.data, e)
+            await self._report_error(query, acked, "Error processing request")
         except Exception as e:
-            logger.error(f"Error handling callback: {e}")
-            try:
-                await query.answer(f"Error: {str(e)}", show_alert=True)
-            except:
-                pass
+            logger.opt(exception=True).error("Unexpected error handling callback {}: {}", query.data, e)
+            await self._report_error(query, acked, "Error processing request")
+
+    async def _report_error(self, query, acked: bool, message: str) -> None:
+        """Show an error as an alert, or in the message once the query has already been answered"""
+        if not acked:
+            await self._answer_quietly(query, message, show_alert=True)
+            return
+        try:
+            await query.edit_message_text(f"❌ {message}", reply_markup=back_button("menu"))
+        except TelegramError as e:
+            logger.warning("Failed to report callback error for {}: {}", query.data, e)
+
+    def _get_context(self, user_id: int):
+        """User's context dict, or None if the user has no state yet"""
+        user_state = self.user_states.get(user_id)
+        return user_state.context if user_state else None
+
+    def _ensure_context(self, user_id: int) -> dict:
+        """User's context dict, creating the user's state if needed"""
+        try:
+            user_state = self.user_states[user_id]
+        except KeyError:
+            user_state = self.user_states[user_id] = UserState(self.STATE_MAIN_MENU)
+        return user_state.context
+
+    async def _show_history_for_context(self, query, user_id: int, ctx: dict) -> None:
+        """Re-run the history search stored in the user's context"""
+        range_type = ctx.get("history_range_type", "today")
+        from_date = ctx.get("from_date")
+        to_date = ctx.get("to_date")
+
+        if range_type == "custom" and from_date and to_date:
+            await self.views.show_history_results(query, user_id, "custom", from_date, to_date)
+        else:
+            await self.views.show_history_results(query, user_id, range_type)
+
+    async def _history_calendar_reset(self, query, user_id: int) -> None:
+        """Reset calendar selection"""
+        ctx = self._get_context(user_id)
+        if ctx is not None:
+            ctx.pop("from_date", None)
+            ctx.pop("to_date", None)
+        await self.views.show_history_calendar(query, user_id)
+
+    async def _history_custom_view(self, query, user_id: int) -> None:
+        """View custom date range"""
+        ctx = self._get_context(user_id)
+        if ctx is not None:
+            from_date = ctx.get("from_date")
+            to_date = ctx.get("to_date")
+            if from_date and to_date:
+                await self.views.show_history_results(query, user_id, "custom", from_date, to_date)
+            else:
+                await query.answer("Please select both start and end dates", show_alert=True)
+
+    async def _history_back(self, query, user_id: int) -> None:
+        """Go back to history results using stored context"""
+        ctx = self._get_context(user_id)
+        if ctx is not None:
+            await self._show_history_for_context(query, user_id, ctx)
+        else:
+            await self.views.show_history_menu(query, user_id)
+
+    async def _history_page(self, query, user_id: int, delta: int) -> None:
+        """Move the history results page by delta"""
+        ctx = self._get_context(user_id)
+        if ctx is not None:
+            ctx["history_page"] = max(0, ctx.get("history_page", 0) + delta)
+            await self._show_history_for_context(query, user_id, ctx)
+
+    async def _close_lot(self, query, user_id: int, identifier: int, lot_size: float) -> None:
+        """close_lot_{identifier}-{lot_size}"""
+        logger.info("Close lot callback: identifier={}, lot_size={}", identifier, lot_size)
+        await self.actions.handle_close_custom_lot(query, user_id, identifier, lot_size)
+
+    async def _history_detail(self, query, user_id: int, result_index: int) -> None:
+        """history_detail_{index}"""
+        logger.info("[HISTORY_HANDLER] User {} viewing history detail for result_index: {}", user_id, result_index)
+        await self.views.show_history_detail(query, user_id, result_index)
+
+    async def _cal_prev(self, query, user_id: int, year: int, month: int, mode: str) -> None:
+        """Navigate to previous month"""
+        if month == 1:
+            year -= 1
+            month = 12
+        else:
+            month -= 1
+
+        await self.views.show_history_calendar(query, user_id, year, month, mode)
+
+    async def _cal_next(self, query, user_id: int, year: int, month: int, mode: str) -> None:
+        """Navigate to next month"""
+        if month == 12:
+            year += 1
+            month = 1
+        else:
+            month += 1
+
+        await self.views.show_history_calendar(query, user_id, year, month, mode)
+
+    async def _cal_day(self, query, user_id: int, year: int, month: int, day: int, mode: str) -> None:
+        """Select a day as the 'from' or 'to' date"""
+        try:
+            selected_date = datetime(year, month, day)
+        except ValueError as e:
+            raise CallbackError("Invalid date") from e
+
+        # Store in user context
+        ctx = self._ensure_context(user_id)
+
+        if mode == _CAL_FROM:
+            ctx["from_date"] = selected_date
+            # Switch to selecting 'to' date
+            await self.views.show_history_calendar(query, user_id, year, month, _CAL_TO)
+        else:  # mode == "to"
+            from_date = ctx.get("from_date")
+
+            # Validate: to_date must be >= from_date
+            if from_date and selected_date < from_date:
+                await self.views.show_history_calendar(
+                    query, user_id, year, month, _CAL_TO, error_banner="End date must be after start date")
+            else:
+                ctx["to_date"] = selected_date
+                # Show calendar with both dates selected
+                await self.views.show_history_calendar(query, user_id, year, month, _CAL_TO)
+
+    # Compound callbacks keyed by route key: {key: handler(self, query, user_id, *typed_args)}
+    _ACTION_HANDLERS = {
+        _CB_SIGNAL: lambda self, q, u, signal_id: self.views.show_signal_detail(q, u, signal_id),
+        _CB_POSITION: lambda self, q, u, ticket: self.views.show_position_detail(q, u, ticket),
+        _CB_CLOSE: lambda self, q, u, identifier, close_type: self.actions.handle_close_action(q, u, identifier, close_type),
+        _CB_CLOSE_LOT: _close_lot,
+        _CB_UPDATE: lambda self, q, u, identifier, update_type: self.actions.handle_update_action(q, u, identifier, update_type),
+        _CB_DELETE: lambda self, q, u, ticket: self.actions.handle_delete_order(q, u, ticket),
+        _CB_MANAGE: lambda self, q, u, signal_id, entry_type: self.views.show_manage_signal_entries(q, u, signal_id, entry_type),
+        _CB_HISTORY_DETAIL: _history_detail,
+        _CB_CAL_PREV: _cal_prev,
+        _CB_CAL_NEXT: _cal_next,
+        _CB_CAL_DAY: _cal_day,
+        _CB_ANALYZE_DETAIL: lambda self, q, u, channel_idx: self.views.show_channel_detail(q, u, channel_idx),
+    }
+
+    async def _send_main_menu(self, update: Update) -> None:
+        """Default reply for text outside an input state"""
+        await update.message.reply_text(
+            self._main_menu_text,
+            parse_mode="Markdown",
+            reply_markup=self._main_menu_markup
+        )
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle text messages for state-based input only"""
+        user_id = update.effective_user.id
+
+        # Queue behind this user's pending callbacks so a slow MT5 call for one
+        # user never holds up the update loop for everyone else
+        self._enqueue(user_id, "message", partial(self._process_message, update, user_id))
+
+    async def _process_message(self, update: Update, user_id: int) -> None:
+        """Dispatch a text message on the user's current input state"""
+        user_state = self.user_states.get(user_id)
+        state = user_state.state if user_state else None
+        message_text = update.message.text
+
+        handler = self._state_dispatch.get(state)
         try:
-            user_id = update.effective_user.id
-            user_state = self.user_states.get(user_id, {})
-            state = user_state.get("state")
-            message_text = update.message.text
-
-            if state == self.STATE_AWAITING_LOT:
-                await self.input_handler.handle_lot_input(update, user_id, message_text)
-            elif state == self.STATE_AWAITING_SL:
-                await self.input_handler.handle_sl_input(update, user_id, message_text)
-            elif state == self.STATE_AWAITING_TP:
-                await self.input_handler.handle_tp_input(update, user_id, message_text)
-            elif state == "awaiting_trade_input":
-                await self.input_handler.handle_trade_input(update, user_id, message_text)
-            elif state == self.STATE_TESTER:
-                await self.input_handler.handle_tester_input(update, user_id, message_text)
+            if handler:
+                await handler(update, user_id, message_text)
             else:
-                # Default: show main menu
-                text = "👋 **Signal Trader Bot Menu**\n\nSelect an option:"
-                buttons = [
-                    [
-                        InlineKeyboardButton("📊 Active Signals", callback_data="signals"),
-                        InlineKeyboardButton("📈 Active Positions", callback_data="positions"),
-                    ],
-                    [
-                        InlineKeyboardButton("🔄 New Trade", callback_data="open_trade"),
-                        InlineKeyboardButton("🧪 Signal Tester", callback_data="tester"),
-                    ],
-                    [
-                        InlineKeyboardButton("💼 Trade Summary", callback_data="trade"),
-                        InlineKeyboardButton("📜 History", callback_data="history"),
-                    ],
-                ]
-                await update.message.reply_text(
-                    text,
-                    parse_mode="Markdown",
-                    reply_markup=InlineKeyboardMarkup(buttons)
-                )
-        except Exception as e:
-            logger.error(f"Error handling message: {e}")
+                await self._send_main_menu(update)
+        except (TelegramError, ValueError) as e:
+            logger.opt(exception=True).error("Error handling message: {}", e)
@@ -2,40 +2,76 @@
 Helper utilities for database queries and signal/position lookups
 """
 
-from typing import Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Dict, Iterable, Optional
 from loguru import logger
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from Database.database_manager import db_manager
+from Database.repository.cache import LRUCache
 
+# Short-lived cache for DB lookups repeated while users page through positions/history.
+# Only database rows are cached; live MT5 state is always fetched fresh.
+_lookup_cache = LRUCache(max_size=128, default_ttl=5.0)
+
+# The MetaTrader5 package is not thread-safe, so every blocking terminal call
+# from the bot runs on this single thread, one at a time
+_mt5_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5")
+
+
+async def run_mt(fn, *args, **kwargs):
+    """Run a blocking MetaTrader call on the MT5 thread so the event loop keeps serving other users"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_mt5_executor, partial(fn, *args, **kwargs))
+
+
+def clear_lookup_cache() -> None:
+    """Drop cached ticket/signal lookups (call after writes that relink positions)"""
+    _lookup_cache.clear()
 
-def find_signal_by_ticket(ticket: int) -> Optional[object]:
-    """Find signal linked to MT5 ticket from database"""
-    try:
-        position_repo = db_manager.get_position_repository()
-        db_position = position_repo.get_position_by_ticket(ticket)
 
-        if not db_position:
-            return None
+_MISSING = object()
 
-        signal_id = db_position.signal_id if hasattr(db_position, 'signal_id') else db_position.get("signal_id")
 
+def get_field(obj, name: str, default: Any = None) -> Any:
+    """Read a field from a model object or a dict row"""
+    value = getattr(obj, name, _MISSING)
+    if value is not _MISSING:
+        return value
+    return obj.get(name, default)
+
+
+@lru_cache(maxsize=1024)
+def back_button(callback_data: str) -> InlineKeyboardMarkup:
+    """Single "⬅️ Back" button markup, shared per callback target"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=callback_data)]])
+
+
+def find_signals_by_tickets(tickets: Iterable[int]) -> Dict[int, object]:
+    """Signals linked to many MT5 tickets in one batched query, keyed by ticket"""
+    try:
         signal_repo = db_manager.get_signal_repository()
-        signal = signal_repo.get_signal_by_id(signal_id)
-        return signal
+        return signal_repo.get_signals_by_position_ids(list(tickets))
     except Exception as e:
-        logger.error(f"Error finding signal by ticket: {e}")
-        return None
+        logger.error(f"Error finding signals by tickets: {e}")
+        return {}
 
 
 def get_position_for_signal(meta_trader, signal_id: int) -> Optional[object]:
     """Get MT5 position linked to a signal"""
     try:
-        position_repo = db_manager.get_position_repository()
-        db_position = position_repo.get_position_by_signal_id(signal_id)
+        cache_key = f"position_by_signal:{signal_id}"
+        db_position = _lookup_cache.get(cache_key)
+        if db_position is None:
+            position_repo = db_manager.get_position_repository()
+            db_position = position_repo.get_position_by_signal_id(signal_id)
 
-        if not db_position:
-            return None
+            if not db_position:
+                return None
+            _lookup_cache.put(cache_key, db_position)
 
-        ticket = db_position.position_id if hasattr(db_position, 'position_id') else db_position.get("position_id")
+        ticket = get_field(db_position, "position_id")
         mt5_position = meta_trader.get_position_by_ticket(ticket) if meta_trader else None
 
         return mt5_position
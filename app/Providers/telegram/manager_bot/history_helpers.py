@@ -2,27 +2,34 @@
 Helper utilities for fetching and analyzing historical trading data
 """
 
+import time
+from collections import defaultdict
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+from operator import attrgetter, itemgetter
 from loguru import logger
 import MetaTrader5 as mt5
 from Database.database_manager import db_manager
+from Database.repository.cache import LRUCache
 
 
-def get_date_range_timestamps(range_type: str, from_date: datetime = None, to_date: datetime = None) -> Tuple[datetime, datetime]:
-    """
-    Get timestamp range based on type (today, yesterday, or custom)
+# Last broker-time reading: (time.monotonic() when read, broker datetime at that moment)
+_broker_time_cache = {'ts': 0.0, 'val': None}
+BROKER_TIME_TTL = 5.0
 
-    Uses MT5 broker time instead of server time to ensure correct date ranges
 
-    Args:
-        range_type: "today", "yesterday", or "custom"
-        from_date: Start date for custom range
-        to_date: End date for custom range
+def _get_broker_now() -> datetime:
+    """
+    Current MT5 broker time, falling back to system time
 
-    Returns:
-        Tuple of (start_datetime, end_datetime)
+    The account_info() IPC round-trip is made at most once per BROKER_TIME_TTL seconds;
+    in between, the cached reading is advanced by the monotonic time elapsed since.
     """
+    elapsed = time.monotonic() - _broker_time_cache['ts']
+    if _broker_time_cache['val'] is not None and elapsed <= BROKER_TIME_TTL:
+        return _broker_time_cache['val'] + timedelta(seconds=elapsed)
+
     # Get broker's current time from MT5 instead of server time
     try:
         account_info = mt5.account_info()
@@ -38,6 +45,26 @@ def get_date_range_timestamps(range_type: str, from_date: datetime = None, to_da
         logger.warning(f"Error getting MT5 broker time: {e}, using system time")
         now = datetime.now()
 
+    _broker_time_cache.update(ts=time.monotonic(), val=now)
+    return now
+
+
+def get_date_range_timestamps(range_type: str, from_date: datetime = None, to_date: datetime = None) -> Tuple[datetime, datetime]:
+    """
+    Get timestamp range based on type (today, yesterday, or custom)
+
+    Uses MT5 broker time instead of server time to ensure correct date ranges
+
+    Args:
+        range_type: "today", "yesterday", or "custom"
+        from_date: Start date for custom range
+        to_date: End date for custom range
+
+    Returns:
+        Tuple of (start_datetime, end_datetime)
+    """
+    now = _get_broker_now()
+
     if range_type == "today":
         start = datetime(now.year, now.month, now.day, 0, 0, 0)
         end = datetime(now.year, now.month, now.day, 23, 59, 59)
@@ -57,6 +84,21 @@ def get_date_range_timestamps(range_type: str, from_date: datetime = None, to_da
     return start, end
 
 
+# Raw MT5 history per (kind, range), shared by the deal/order getters; filtering stays per call
+_history_cache = LRUCache(max_size=32, default_ttl=10.0)
+
+
+def _fetch_history(kind: str, fetch, from_date: datetime, to_date: datetime):
+    """Run an MT5 history_*_get call, reusing the raw result for the same range for 10 seconds"""
+    cache_key = f"{kind}:{from_date.timestamp()}:{to_date.timestamp()}"
+    records = _history_cache.get(cache_key)
+    if records is None:
+        records = fetch(from_date, to_date)
+        if records is not None:
+            _history_cache.put(cache_key, records)
+    return records
+
+
 def get_historical_deals(from_date: datetime, to_date: datetime, magic: int = 2025) -> List:
     """
     Fetch historical deals from MT5 for a given date range
@@ -70,7 +112,7 @@ def get_historical_deals(from_date: datetime, to_date: datetime, magic: int = 20
         List of deal objects
     """
     try:
-        deals = mt5.history_deals_get(from_date, to_date)
+        deals = _fetch_history('deals', mt5.history_deals_get, from_date, to_date)
         if deals is None or len(deals) == 0:
             logger.info(f"No deals found for range {from_date} to {to_date}")
             return []
@@ -97,7 +139,7 @@ def get_historical_orders(from_date: datetime, to_date: datetime, magic: int = 2
         List of order objects
     """
     try:
-        orders = mt5.history_orders_get(from_date, to_date)
+        orders = _fetch_history('orders', mt5.history_orders_get, from_date, to_date)
         if orders is None or len(orders) == 0:
             logger.info(f"No orders found for range {from_date} to {to_date}")
             return []
@@ -111,6 +153,11 @@ def get_historical_orders(from_date: datetime, to_date: datetime, magic: int = 2
         return []
 
 
+def _position_id_getter(deal):
+    """attrgetter for a deal's position id ('position_id', or 'position' on older MT5 builds)"""
+    return attrgetter('position_id' if hasattr(deal, 'position_id') else 'position')
+
+
 def group_deals_by_position(deals: List) -> Dict[int, List]:
     """
     Group MT5 deals by their position_id (canonical identifier).
@@ -131,14 +178,113 @@ def group_deals_by_position(deals: List) -> Dict[int, List]:
     Returns:
         Dictionary mapping position_id (int) to list of deals for that position
     """
-    grouped = {}
+    if not deals:
+        return {}
+
+    # Deals share one schema: resolve the position_id attribute (the canonical identifier) once
+    get_position_id = _position_id_getter(deals[0])
+    grouped = defaultdict(list)
     for deal in deals:
-        # Extract position_id from deal (the canonical identifier)
-        position_id = deal.position_id if hasattr(deal, 'position_id') else deal.position
-        if position_id not in grouped:
-            grouped[position_id] = []
-        grouped[position_id].append(deal)
-    return grouped
+        grouped[get_position_id(deal)].append(deal)
+    return dict(grouped)
+
+
+# Exit reasons stored in metrics['exit_reason'] (views match on these strings; TP levels are "TP1", "TP2", ...)
+EXIT_UNKNOWN = "UNKNOWN"
+EXIT_STILL_OPEN = "STILL_OPEN"
+EXIT_OPEN = "OPEN"
+EXIT_STOP_LOSS = "STOP_LOSS"
+EXIT_MANUAL_CLOSE = "MANUAL_CLOSE"
+
+# Exit-price tolerance for SL/TP matching by symbol substring, first match wins
+_EXIT_PRICE_THRESHOLDS = (
+    ('XAU', 2.0),     # $2 for gold (accounts for slippage)
+    ('GOLD', 2.0),
+    ('XAG', 0.10),    # 10 cents for silver
+    ('SILVER', 0.10),
+    ('JPY', 0.10),    # 10 pips for JPY pairs
+)
+_DEFAULT_EXIT_PRICE_THRESHOLD = 0.0010  # 10 pips for other forex pairs
+
+
+def _parse_tp_levels(tp_list) -> Tuple[Optional[float], ...]:
+    """
+    Parse a signal's TP levels once, when its signal dict is built
+
+    Accepts the DB's comma-separated string or a list; unparseable list entries
+    become None so TP numbering still follows the signal's order.
+    """
+    if isinstance(tp_list, str):
+        try:
+            return tuple(float(x.strip()) for x in tp_list.split(',') if x.strip())
+        except ValueError:
+            return ()
+    if isinstance(tp_list, list):
+        levels = []
+        for tp in tp_list:
+            try:
+                levels.append(float(tp))
+            except (TypeError, ValueError):
+                levels.append(None)
+        return tuple(levels)
+    return ()
+
+
+@lru_cache(maxsize=None)
+def _tp_exit_reason(idx: int) -> str:
+    """Shared 'TP{idx}' label, so every position closed at the same TP carries the same string object"""
+    return f"TP{idx}"
+
+
+def _classify_exit(exit_price: float, sl: Optional[float], tp_levels: Tuple, threshold: float) -> str:
+    """Exit reason of a closed position: STOP_LOSS, TP{n} (1-based), or MANUAL_CLOSE"""
+    # Check SL first (sl is already converted to float or None)
+    if sl and abs(exit_price - sl) <= threshold:
+        return EXIT_STOP_LOSS
+
+    # If not SL, check TP levels
+    for idx, tp in enumerate(tp_levels, 1):
+        if tp is not None and abs(exit_price - tp) <= threshold:
+            return _tp_exit_reason(idx)
+
+    # Otherwise it's a manual close
+    return EXIT_MANUAL_CLOSE
+
+
+def _single_deal_metrics(deal, signal_data: Dict = None) -> Dict:
+    """Metrics for a position with only its entry deal (still open): no exit, no classification"""
+    net_profit = deal.profit + deal.commission + deal.swap
+    volume = deal.volume if deal.entry == 0 else 0
+
+    roi_percent = 0
+    if signal_data:
+        entry_value = volume * deal.price * 100000  # Assuming forex, contract size 100k
+        if entry_value > 0:
+            roi_percent = (net_profit / entry_value) * 100
+
+    time_in_trade = timedelta(0)
+    return {
+        'position_id': _position_id_getter(deal)(deal),
+        'symbol': deal.symbol,
+        'position_type': "BUY" if deal.type == 0 else "SELL",
+        'entry_price': deal.price,
+        'exit_price': deal.price,
+        'volume': volume,
+        'entry_time': datetime.fromtimestamp(deal.time),
+        'exit_time': None,
+        'time_in_trade': time_in_trade,
+        'time_in_trade_str': format_timedelta(time_in_trade),
+        'profit': deal.profit,
+        'commission': deal.commission,
+        'swap': deal.swap,
+        'net_profit': net_profit,
+        'roi_percent': roi_percent,
+        'exit_reason': EXIT_STILL_OPEN,
+        'price_change': 0,
+        'max_drawdown': 0,
+        'max_drawdown_percent': 0,
+        'num_deals': 1
+    }
 
 
 def calculate_position_metrics(deals: List, signal_data: Dict = None) -> Dict:
@@ -154,33 +300,35 @@ def calculate_position_metrics(deals: List, signal_data: Dict = None) -> Dict:
     """
     if not deals:
         return {}
+    if len(deals) == 1:
+        return _single_deal_metrics(deals[0], signal_data)
 
-    # Sort deals by time
-    sorted_deals = sorted(deals, key=lambda d: d.time)
+    # Sort deals by time (MT5 already returns them in time order, so usually a no-op)
+    if all(a.time <= b.time for a, b in zip(deals, deals[1:])):
+        sorted_deals = deals
+    else:
+        sorted_deals = sorted(deals, key=attrgetter('time'))
 
     # First deal is entry, last deal is exit
     entry_deal = sorted_deals[0]
-    exit_deal = sorted_deals[-1] if len(sorted_deals) > 1 else entry_deal
-
-    # Calculate P&L
-    total_profit = sum(deal.profit for deal in sorted_deals)
-    total_commission = sum(deal.commission for deal in sorted_deals)
-    total_swap = sum(deal.swap for deal in sorted_deals)
+    exit_deal = sorted_deals[-1]
+
+    # Calculate P&L and volume in a single pass over the deals
+    total_profit = total_commission = total_swap = total_volume = 0
+    for deal in sorted_deals:
+        total_profit += deal.profit
+        total_commission += deal.commission
+        total_swap += deal.swap
+        if deal.entry == 0:  # Entry deals only
+            total_volume += deal.volume
     net_profit = total_profit + total_commission + total_swap
 
-    # Calculate volume
-    total_volume = sum(deal.volume for deal in sorted_deals if deal.entry == 0)  # Entry deals only
-
     # Calculate time in trade
-    if len(sorted_deals) > 1:
-        time_in_trade_seconds = exit_deal.time - entry_deal.time
-        time_in_trade = timedelta(seconds=time_in_trade_seconds)
-    else:
-        time_in_trade = timedelta(0)
+    time_in_trade = timedelta(seconds=exit_deal.time - entry_deal.time)
 
     # Get entry and exit prices
     entry_price = entry_deal.price
-    exit_price = exit_deal.price if len(sorted_deals) > 1 else entry_price
+    exit_price = exit_deal.price
 
     # Determine position type (BUY/SELL)
     position_type = "BUY" if entry_deal.type == 0 else "SELL"
@@ -204,10 +352,12 @@ def calculate_position_metrics(deals: List, signal_data: Dict = None) -> Dict:
             roi_percent = (net_profit / entry_value) * 100
 
     # Determine exit reason
-    exit_reason = "UNKNOWN"
-    if signal_data and len(sorted_deals) > 1:  # Must have actually closed
+    exit_reason = EXIT_UNKNOWN
+    if signal_data:  # Multiple deals: the position has actually closed
         sl = signal_data.get('stop_loss')
-        tp_list = signal_data.get('tp_list', [])
+        tp_levels = signal_data.get('tp_levels')
+        if tp_levels is None:
+            tp_levels = _parse_tp_levels(signal_data.get('tp_list'))
 
         # Convert SL to float if it's a string or None
         if sl and sl != 0 and sl != "0":
@@ -218,50 +368,17 @@ def calculate_position_metrics(deals: List, signal_data: Dict = None) -> Dict:
         else:
             sl = None
 
-        # Parse TP list if it's a string
-        if tp_list and isinstance(tp_list, str):
-            try:
-                tp_list = [float(x.strip()) for x in tp_list.split(',') if x.strip()]
-            except:
-                tp_list = []
-        elif not tp_list or not isinstance(tp_list, list):
-            tp_list = []
-
-        if sl or tp_list:
+        if sl or tp_levels:
 
             # Use a more flexible threshold based on symbol (accounting for slippage)
             # Thresholds are generous to account for market slippage
             symbol = entry_deal.symbol.upper()
-            if 'XAU' in symbol or 'GOLD' in symbol:
-                threshold = 2.0  # $2 for gold (accounts for slippage)
-            elif 'XAG' in symbol or 'SILVER' in symbol:
-                threshold = 0.10  # 10 cents for silver
-            elif 'JPY' in symbol:
-                threshold = 0.10  # 10 pips for JPY pairs
-            else:
-                threshold = 0.0010  # 10 pips for other forex pairs
-
-            # Check SL first (sl is already converted to float or None)
-            if sl:
-                if abs(exit_price - sl) <= threshold:
-                    exit_reason = "STOP_LOSS"
-
-            # If not SL, check TP levels
-            if exit_reason == "UNKNOWN" and tp_list:
-                for idx, tp in enumerate(tp_list, 1):
-                    try:
-                        tp_float = float(tp)
-                        if abs(exit_price - tp_float) <= threshold:
-                            exit_reason = f"TP{idx}"
-                            break
-                    except:
-                        continue
+            threshold = next(
+                (t for sub, t in _EXIT_PRICE_THRESHOLDS if sub in symbol),
+                _DEFAULT_EXIT_PRICE_THRESHOLD
+            )
 
-            # If still unknown, it's a manual close
-            if exit_reason == "UNKNOWN":
-                exit_reason = "MANUAL_CLOSE"
-    elif len(sorted_deals) == 1:
-        exit_reason = "STILL_OPEN"
+            exit_reason = _classify_exit(exit_price, sl, tp_levels, threshold)
 
     # Calculate maximum drawdown (approximate - we don't have tick data)
     # This is a simplified calculation
@@ -270,14 +387,14 @@ def calculate_position_metrics(deals: List, signal_data: Dict = None) -> Dict:
 
     # Build comprehensive metrics dictionary
     metrics = {
-        'position_id': entry_deal.position_id if hasattr(entry_deal, 'position_id') else entry_deal.position,
+        'position_id': _position_id_getter(entry_deal)(entry_deal),
         'symbol': entry_deal.symbol,
         'position_type': position_type,
         'entry_price': entry_price,
         'exit_price': exit_price,
         'volume': total_volume,
         'entry_time': datetime.fromtimestamp(entry_deal.time),
-        'exit_time': datetime.fromtimestamp(exit_deal.time) if len(sorted_deals) > 1 else None,
+        'exit_time': datetime.fromtimestamp(exit_deal.time),
         'time_in_trade': time_in_trade,
         'time_in_trade_str': format_timedelta(time_in_trade),
         'profit': total_profit,
@@ -297,8 +414,18 @@ def calculate_position_metrics(deals: List, signal_data: Dict = None) -> Dict:
 
 def format_timedelta(td: timedelta) -> str:
     """Format timedelta as human-readable string"""
-    days = td.days
-    hours, remainder = divmod(td.seconds, 3600)
+    total_seconds = int(td.total_seconds())
+    # Seconds are only shown under a minute, so longer durations share a per-minute cache entry
+    if total_seconds >= 60:
+        total_seconds -= total_seconds % 60
+    return _format_seconds(total_seconds)
+
+
+@lru_cache(maxsize=1024)
+def _format_seconds(total_seconds: int) -> str:
+    """Memoized formatter behind format_timedelta"""
+    days, day_seconds = divmod(total_seconds, 86400)
+    hours, remainder = divmod(day_seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
 
     parts = []
@@ -314,6 +441,23 @@ def format_timedelta(td: timedelta) -> str:
     return " ".join(parts)
 
 
+def _build_signal_data(signal) -> Dict:
+    """Flatten a SignalModel into the signal dict attached to history results"""
+    return {
+        'signal_id': signal.id,
+        'provider': signal.provider if signal.provider else 'telegram',
+        'channel': signal.telegram_channel_title,
+        'message_id': signal.telegram_message_id,
+        'chat_id': signal.telegram_message_chatid,
+        'signal_type': signal.signal_type,
+        'open_price': signal.open_price,
+        'stop_loss': signal.stop_loss,
+        'tp_list': signal.tp_list,
+        'tp_levels': _parse_tp_levels(signal.tp_list),
+        'symbol': signal.symbol
+    }
+
+
 def match_positions_with_signals(deals: List) -> List[Dict]:
     """
     Match historical deals with signals from database
@@ -339,48 +483,46 @@ def match_positions_with_signals(deals: List) -> List[Dict]:
         signal_repo = db_manager.get_signal_repository()
         position_repo = db_manager.get_position_repository()
 
-        results = []
+        # One JOIN query for every position instead of one per position
+        signals_by_position = signal_repo.get_signals_by_position_ids(list(grouped_deals))
+
+        # DIAGNOSTIC prefetch: deal tickets of unmatched positions that the DB stored as position IDs
+        stored_deal_tickets = set()
+        missing_tickets = [
+            d.ticket
+            for pid, position_deals in grouped_deals.items() if pid not in signals_by_position
+            for d in position_deals
+        ]
+        if missing_tickets:
+            try:
+                stored_deal_tickets = {p.position_id for p in position_repo.get_positions_by_tickets(missing_tickets)}
+            except Exception as e:
+                logger.warning(f"[MATCH_SIGNALS] Diagnostic ticket lookup failed: {e}")
+
+        results = [None] * len(grouped_deals)
         signals_found = 0
         signals_not_found = 0
         mismatched_tickets = []
 
-        for position_id, position_deals in grouped_deals.items():
-            # Try to find signal for this position using direct method (JOIN query)
-            signal = signal_repo.get_signal_by_position_id(position_id)
+        for i, (position_id, position_deals) in enumerate(grouped_deals.items()):
+            signal = signals_by_position.get(position_id)
 
             signal_data = None
             if signal:
                 signals_found += 1
-                # SignalModel object - access attributes directly
-                signal_data = {
-                    'signal_id': signal.id,
-                    'provider': signal.provider if signal.provider else 'telegram',
-                    'channel': signal.telegram_channel_title,
-                    'message_id': signal.telegram_message_id,
-                    'chat_id': signal.telegram_message_chatid,
-                    'signal_type': signal.signal_type,
-                    'open_price': signal.open_price,
-                    'stop_loss': signal.stop_loss,
-                    'tp_list': signal.tp_list,
-                    'symbol': signal.symbol
-                }
+                signal_data = _build_signal_data(signal)
             else:
                 signals_not_found += 1
 
                 # DIAGNOSTIC: Try to find if any of the deal tickets are in the database (only for first few)
                 if len(mismatched_tickets) < 3:  # Only check first 3 to avoid spam
-                    deal_tickets = [d.ticket for d in position_deals]
-                    for deal_ticket in deal_tickets:
-                        try:
-                            diagnostic_query = position_repo.get_position_by_ticket(deal_ticket)
-                            if diagnostic_query:
-                                mismatched_tickets.append({
-                                    'db_stored': deal_ticket,
-                                    'correct_position_id': position_id
-                                })
-                                break
-                        except:
-                            pass
+                    for d in position_deals:
+                        if d.ticket in stored_deal_tickets:
+                            mismatched_tickets.append({
+                                'db_stored': d.ticket,
+                                'correct_position_id': position_id
+                            })
+                            break
 
             # Calculate metrics
             metrics = calculate_position_metrics(position_deals, signal_data)
@@ -392,7 +534,8 @@ def match_positions_with_signals(deals: List) -> List[Dict]:
                 'has_signal': signal_data is not None
             }
 
-            results.append(result)
+            # Keyed by entry time for the final sort
+            results[i] = (metrics['entry_time'], result)
 
         # Summary logging
         logger.info(f"[MATCH_SIGNALS] Summary: {len(grouped_deals)} positions | {signals_found} with signals | {signals_not_found} without signals")
@@ -406,15 +549,31 @@ def match_positions_with_signals(deals: List) -> List[Dict]:
             logger.error(f"[MATCH_SIGNALS] ⚠️ See CRITICAL_FIX_POSITION_ID.md for details")
 
         # Sort by entry time (newest first)
-        results.sort(key=lambda x: x['metrics']['entry_time'], reverse=True)
+        results.sort(key=itemgetter(0), reverse=True)
 
-        return results
+        return [result for _, result in results]
 
     except Exception as e:
         logger.error(f"[MATCH_SIGNALS] Error matching positions with signals: {e}", exc_info=True)
         return []
 
 
+_get_open_position_fields = attrgetter(
+    'ticket', 'symbol', 'type', 'price_open', 'price_current', 'profit', 'volume', 'time'
+)
+
+
+def _open_position_fields(pos) -> Tuple:
+    """(ticket, symbol, type, price_open, price_current, profit, volume, time) of an MT5 position or its dict form"""
+    if isinstance(pos, dict):
+        return (
+            pos.get('ticket'), pos.get('symbol'), pos.get('type'),
+            pos.get('price_open', 0), pos.get('price_current', 0),
+            pos.get('profit', 0), pos.get('volume', 0), pos.get('time', 0)
+        )
+    return _get_open_position_fields(pos)
+
+
 def get_open_positions_with_metrics(meta_trader) -> List[Dict]:
     """
     Get currently open positions with calculated metrics
@@ -432,40 +591,21 @@ def get_open_positions_with_metrics(meta_trader) -> List[Dict]:
         positions = meta_trader.get_open_positions() or []
         signal_repo = db_manager.get_signal_repository()
 
-        results = []
-
-        for pos in positions:
-            ticket = pos.ticket if hasattr(pos, 'ticket') else pos.get('ticket')
+        position_fields = [_open_position_fields(pos) for pos in positions]
+        signals_by_position = signal_repo.get_signals_by_position_ids([fields[0] for fields in position_fields])
 
-            # Find signal for this position using direct method (JOIN query)
-            signal = signal_repo.get_signal_by_position_id(ticket)
+        results = []
 
-            signal_data = None
-            if signal:
-                # SignalModel object - access attributes directly
-                signal_data = {
-                    'signal_id': signal.id,
-                    'provider': signal.provider if signal.provider else 'telegram',
-                    'channel': signal.telegram_channel_title,
-                    'message_id': signal.telegram_message_id,
-                    'chat_id': signal.telegram_message_chatid,
-                    'signal_type': signal.signal_type,
-                    'open_price': signal.open_price,
-                    'stop_loss': signal.stop_loss,
-                    'tp_list': signal.tp_list,
-                    'symbol': signal.symbol
-                }
+        for ticket, symbol, pos_type, entry_price, current_price, profit, volume, open_time in position_fields:
+            signal = signals_by_position.get(ticket)
+            signal_data = _build_signal_data(signal) if signal else None
 
             # Calculate metrics for open position
-            entry_price = pos.price_open if hasattr(pos, 'price_open') else pos.get('price_open', 0)
-            current_price = pos.price_current if hasattr(pos, 'price_current') else pos.get('price_current', 0)
-            profit = pos.profit if hasattr(pos, 'profit') else pos.get('profit', 0)
-            volume = pos.volume if hasattr(pos, 'volume') else pos.get('volume', 0)
-            position_type = "BUY" if pos.type == 0 else "SELL"
+            position_type = "BUY" if pos_type == 0 else "SELL"
 
             # Calculate time in trade
-            open_time = pos.time if hasattr(pos, 'time') else pos.get('time', 0)
-            time_in_trade = datetime.now() - datetime.fromtimestamp(open_time)
+            # Elapsed seconds directly; no datetime conversion needed for a duration
+            time_in_trade = timedelta(seconds=max(0.0, time.time() - open_time))
 
             # Calculate approximate ROI
             roi_percent = 0
@@ -482,7 +622,7 @@ def get_open_positions_with_metrics(meta_trader) -> List[Dict]:
 
             metrics = {
                 'position_id': ticket,
-                'symbol': pos.symbol if hasattr(pos, 'symbol') else pos.get('symbol'),
+                'symbol': symbol,
                 'position_type': position_type,
                 'entry_price': entry_price,
                 'current_price': current_price,
@@ -493,7 +633,7 @@ def get_open_positions_with_metrics(meta_trader) -> List[Dict]:
                 'profit': profit,
                 'net_profit': profit,
                 'roi_percent': roi_percent,
-                'exit_reason': 'OPEN',
+                'exit_reason': EXIT_OPEN,
                 'price_change': price_change,
                 'is_open': True
             }
@@ -2,14 +2,59 @@
 Keyboard input handlers for lot, SL, TP, and signal tester inputs
 """
 
+from functools import lru_cache
+from typing import Optional
+
 from loguru import logger
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+from telegram import Update, ReplyKeyboardMarkup
+
+from Analayzer.Analayzer import parse_message
+from Analayzer.parsers.signal_parser import SignalParser
+from MetaTrader import Trade
+from .helpers import back_button, clear_lookup_cache, run_mt
+from .state import UserStateStore
+from .views import ViewManager
+
+# Parsers bound once at import
+_parse_signal = SignalParser.parse_message
+_parse_trade = parse_message
+
+
+class _MessageQuery:
+    """Callback-query stand-in so views can render into a plain message"""
+
+    def __init__(self, message):
+        self.message = message
+
+    async def edit_message_text(self, *args, **kwargs):
+        await self.message.edit_text(*args, **kwargs)
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+def _try_float(text: str) -> Optional[float]:
+    """Parse a plain decimal like '1.2450' or '-0.5', or None; no ValueError raised on bad input"""
+    text = text.strip()
+    digits = text[1:] if text[:1] in "+-" else text
+    digits = digits.replace(".", "", 1)
+    return float(text) if digits.isascii() and digits.isdigit() else None
+
+
+# Reply keyboard shown after tester/trade input; markups are immutable, so one instance is shared
+_BACK_TO_MENU_KEYBOARD = ReplyKeyboardMarkup([["⬅️ Back to Menu"]], resize_keyboard=True)
+
+
+@lru_cache(maxsize=2048)
+def _back_to_signal_or_positions(signal_id):
+    """Back button to the signal the edit came from, or to the positions list (cached per signal id)"""
+    return back_button(f"signal_{signal_id}") if signal_id else back_button("positions")
 
 
 class InputHandler:
     """Manages keyboard input processing"""
 
-    def __init__(self, user_states: dict, meta_trader=None):
+    def __init__(self, user_states: UserStateStore, meta_trader=None):
         self.user_states = user_states
         self.meta_trader = meta_trader
 
@@ -19,125 +64,136 @@ class InputHandler:
     async def handle_lot_input(self, update: Update, user_id: int, lot_text: str) -> None:
         """Handle lot input from keyboard - close custom lot size"""
         try:
-            identifier = self.user_states[user_id].get("context", {}).get("identifier")
+            user_state = self.user_states.get(user_id)
+            ctx = user_state.context if user_state else None
+            identifier = ctx.get("identifier") if ctx else None
 
             if lot_text == "Custom":
                 await update.message.reply_text("📝 Enter custom lot size (e.g., 0.5):")
                 return
 
-            try:
-                lots = float(lot_text)
-                if self.meta_trader and identifier:
-                    result = self.meta_trader.close_position(identifier, volume=lots)
-                    if result:
-                        await update.message.reply_text(
-                            f"✅ Successfully closed {lots} lots",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                        )
-                    else:
-                        await update.message.reply_text(
-                            f"❌ Failed to close {lots} lots",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
-                        )
+            lots = _try_float(lot_text)
+            if lots is None:
+                await update.message.reply_text("❌ Invalid lot value. Enter a number like 0.5 or 1.0")
+                return
+
+            if self.meta_trader and identifier:
+                result = await run_mt(self.meta_trader.close_position, identifier, volume=lots)
+                if result:
+                    await update.message.reply_text(
+                        f"✅ Successfully closed {lots} lots",
+                        reply_markup=back_button("positions")
+                    )
                 else:
                     await update.message.reply_text(
-                        "❌ MetaTrader not available",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]])
+                        f"❌ Failed to close {lots} lots",
+                        reply_markup=back_button("positions")
                     )
-                self.user_states[user_id]["state"] = self.STATE_POSITION_LIST
-            except ValueError:
-                await update.message.reply_text("❌ Invalid lot value. Enter a number like 0.5 or 1.0")
+            else:
+                await update.message.reply_text(
+                    "❌ MetaTrader not available",
+                    reply_markup=back_button("positions")
+                )
+            if user_state:
+                user_state.state = self.STATE_POSITION_LIST
         except Exception as e:
-            logger.error(f"Error in lot input: {e}")
+            logger.error("Error in lot input: {}", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
 
     async def handle_sl_input(self, update: Update, user_id: int, sl_text: str) -> None:
         """Handle SL input from keyboard - update stop loss"""
         try:
-            identifier = self.user_states[user_id].get("context", {}).get("identifier")
-            signal_id = self.user_states[user_id].get("context", {}).get("signal_id")
+            user_state = self.user_states.get(user_id)
+            ctx = user_state.context if user_state else None
+            identifier = ctx.get("identifier") if ctx else None
+            signal_id = ctx.get("signal_id") if ctx else None
 
-            try:
-                sl_value = float(sl_text)
-                if self.meta_trader and identifier:
-                    result = self.meta_trader.update_position_sl(identifier, sl_value)
-                    # Handle both tuple and boolean returns for compatibility
-                    if isinstance(result, tuple):
-                        success, error_msg = result
-                    else:
-                        success = result
-                        error_msg = None
-                    
-                    if success:
-                        await update.message.reply_text(
-                            f"✅ Stop Loss updated to {sl_value}",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}" if signal_id else "positions")]])
-                        )
-                    else:
-                        error_display = error_msg if error_msg else "Failed to update stop loss"
-                        logger.error(f"Failed to update stop loss for ticket {identifier}: {error_display}")
-                        await update.message.reply_text(
-                            f"❌ Failed to update SL to {sl_value}\n\n💡 {error_display}",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}" if signal_id else "positions")]])
-                        )
+            sl_value = _try_float(sl_text)
+            if sl_value is None:
+                await update.message.reply_text("❌ Invalid SL value. Enter a number like 1.2450")
+                return
+
+            if self.meta_trader and identifier:
+                result = await run_mt(self.meta_trader.update_position_sl, identifier, sl_value)
+                # Handle both tuple and boolean returns for compatibility
+                if isinstance(result, tuple):
+                    success, error_msg = result
                 else:
+                    success = result
+                    error_msg = None
+                
+                if success:
                     await update.message.reply_text(
-                        "❌ MetaTrader not available",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}" if signal_id else "positions")]])
+                        f"✅ Stop Loss updated to {sl_value}",
+                        reply_markup=_back_to_signal_or_positions(signal_id)
                     )
-                self.user_states[user_id]["state"] = "viewing_signal" if signal_id else self.STATE_POSITION_LIST
-            except ValueError:
-                await update.message.reply_text("❌ Invalid SL value. Enter a number like 1.2450")
+                else:
+                    error_display = error_msg if error_msg else "Failed to update stop loss"
+                    logger.error("Failed to update stop loss for ticket {}: {}", identifier, error_display)
+                    await update.message.reply_text(
+                        f"❌ Failed to update SL to {sl_value}\n\n💡 {error_display}",
+                        reply_markup=_back_to_signal_or_positions(signal_id)
+                    )
+            else:
+                await update.message.reply_text(
+                    "❌ MetaTrader not available",
+                    reply_markup=_back_to_signal_or_positions(signal_id)
+                )
+            if user_state:
+                user_state.state = "viewing_signal" if signal_id else self.STATE_POSITION_LIST
         except Exception as e:
-            logger.error(f"Error in SL input: {e}", exc_info=True)
+            logger.error("Error in SL input: {}", e, exc_info=True)
             await update.message.reply_text(f"❌ Error: {str(e)}")
 
     async def handle_tp_input(self, update: Update, user_id: int, tp_text: str) -> None:
         """Handle TP input from keyboard - update take profit"""
         try:
-            identifier = self.user_states[user_id].get("context", {}).get("identifier")
-            signal_id = self.user_states[user_id].get("context", {}).get("signal_id")
+            user_state = self.user_states.get(user_id)
+            ctx = user_state.context if user_state else None
+            identifier = ctx.get("identifier") if ctx else None
+            signal_id = ctx.get("signal_id") if ctx else None
 
-            try:
-                tp_value = float(tp_text)
-                if self.meta_trader and identifier:
-                    result = self.meta_trader.update_position_tp(identifier, tp_value)
-                    # Handle both tuple and boolean returns for compatibility
-                    if isinstance(result, tuple):
-                        success, error_msg = result
-                    else:
-                        success = result
-                        error_msg = None
-                    
-                    if success:
-                        await update.message.reply_text(
-                            f"✅ Take Profit updated to {tp_value}",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}" if signal_id else "positions")]])
-                        )
-                    else:
-                        error_display = error_msg if error_msg else "Failed to update take profit"
-                        logger.error(f"Failed to update take profit for ticket {identifier}: {error_display}")
-                        await update.message.reply_text(
-                            f"❌ Failed to update TP to {tp_value}\n\n💡 {error_display}",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}" if signal_id else "positions")]])
-                        )
+            tp_value = _try_float(tp_text)
+            if tp_value is None:
+                await update.message.reply_text("❌ Invalid TP value. Enter a number like 1.2550")
+                return
+
+            if self.meta_trader and identifier:
+                result = await run_mt(self.meta_trader.update_position_tp, identifier, tp_value)
+                # Handle both tuple and boolean returns for compatibility
+                if isinstance(result, tuple):
+                    success, error_msg = result
                 else:
+                    success = result
+                    error_msg = None
+                
+                if success:
                     await update.message.reply_text(
-                        "❌ MetaTrader not available",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}" if signal_id else "positions")]])
+                        f"✅ Take Profit updated to {tp_value}",
+                        reply_markup=_back_to_signal_or_positions(signal_id)
                     )
-                self.user_states[user_id]["state"] = "viewing_signal" if signal_id else self.STATE_POSITION_LIST
-            except ValueError:
-                await update.message.reply_text("❌ Invalid TP value. Enter a number like 1.2550")
+                else:
+                    error_display = error_msg if error_msg else "Failed to update take profit"
+                    logger.error("Failed to update take profit for ticket {}: {}", identifier, error_display)
+                    await update.message.reply_text(
+                        f"❌ Failed to update TP to {tp_value}\n\n💡 {error_display}",
+                        reply_markup=_back_to_signal_or_positions(signal_id)
+                    )
+            else:
+                await update.message.reply_text(
+                    "❌ MetaTrader not available",
+                    reply_markup=_back_to_signal_or_positions(signal_id)
+                )
+            if user_state:
+                user_state.state = "viewing_signal" if signal_id else self.STATE_POSITION_LIST
         except Exception as e:
-            logger.error(f"Error in TP input: {e}", exc_info=True)
+            logger.error("Error in TP input: {}", e, exc_info=True)
             await update.message.reply_text(f"❌ Error: {str(e)}")
 
     async def handle_tester_input(self, update: Update, user_id: int, signal_text: str) -> None:
         """Parse signal and export: open_price, second_price, SL, TP"""
         try:
-            from Analayzer.parsers.signal_parser import SignalParser
-            result = SignalParser.parse_message(signal_text)
+            result = _parse_signal(signal_text)
 
             if result and result[0] is not None:
                 action_type, symbol, first_price, second_price, take_profits, stop_loss = result
@@ -154,27 +210,21 @@ class InputHandler:
             else:
                 text = "❌ Could not parse. Example:\n`EUR/USD BUY 1.2500 SL: 1.2450 TP: 1.2550, 1.2600`"
 
-            keyboard = [["⬅️ Back to Menu"]]
-            await update.message.reply_text(text, parse_mode="Markdown", reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True))
+            await update.message.reply_text(text, parse_mode="Markdown", reply_markup=_BACK_TO_MENU_KEYBOARD)
         except Exception as e:
-            logger.error(f"Error in tester input: {e}")
-            keyboard = [["⬅️ Back to Menu"]]
-            await update.message.reply_text(f"❌ Error: {str(e)}", reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True))
+            logger.error("Error in tester input: {}", e)
+            await update.message.reply_text(f"❌ Error: {str(e)}", reply_markup=_BACK_TO_MENU_KEYBOARD)
 
     async def handle_trade_input(self, update: Update, user_id: int, trade_text: str) -> None:
         """Handle manual trade input - parse and execute trade"""
         try:
-            from Analayzer.Analayzer import parse_message
-            from MetaTrader import Trade
-            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-            
-            logger.info(f"Trade input received from user {user_id}: {trade_text}")
+            logger.info("Trade input received from user {}: {}", user_id, trade_text)
             
             # Parse the trade text
-            result = parse_message(trade_text)
+            result = _parse_trade(trade_text)
             
             if not result or result[0] is None:
-                logger.warning(f"Failed to parse trade input from user {user_id}")
+                logger.warning("Failed to parse trade input from user {}", user_id)
                 await update.message.reply_text(
                     "❌ Invalid format. Please use:\n"
                     "`SYMBOL ACTION PRICE1 PRICE2 TP1,TP2,... SL COMMENT`\n\n"
@@ -184,7 +234,7 @@ class InputHandler:
                 return
             
             action_type, symbol, first_price, second_price, take_profits, stop_loss = result
-            logger.info(f"Trade parsed: {symbol} {action_type} @{first_price}")
+            logger.info("Trade parsed: {} {} @{}", symbol, action_type, first_price)
             
             # Show loading message
             loading_msg = await update.message.reply_text("⏳ Opening trade...\n\n🔄 Please wait...")
@@ -194,12 +244,14 @@ class InputHandler:
                 chat_id = update.effective_chat.id
                 username = update.effective_user.username or "unknown"
                 message_id = loading_msg.message_id
-                comment = trade_text.split()[-1] if len(trade_text.split()) > 6 else "Manual trade"
+                tokens = trade_text.split()
+                comment = tokens[-1] if len(tokens) > 6 else "Manual trade"
                 
-                logger.info(f"Executing trade for user {username}: {symbol} {action_type}")
+                logger.info("Executing trade for user {}: {} {}", username, symbol, action_type)
                 
-                # Execute trade using the Trade function
-                Trade(
+                # Execute trade using the Trade function; it returns the saved signal's id
+                signal_id = await run_mt(
+                    Trade,
                     message_username=username,
                     message_id=message_id,
                     message_chatid=chat_id,
@@ -212,27 +264,10 @@ class InputHandler:
                     comment=comment,
                     provider="telegram"
                 )
-                
-                # Get the signal that was just created to show its details
-                from Database.database_manager import db_manager
-                signal_repo = db_manager.get_signal_repository()
-                
-                # Try to find the most recent signal for this symbol
-                import time
-                time.sleep(0.5)  # Wait a moment for signal to be saved
-                
-                # Query signals for this symbol
-                signals = signal_repo.get_all_signals_paginated(limit=100, offset=0)
-                matching_signal = None
-                for sig in signals:
-                    sig_symbol = sig.symbol if hasattr(sig, 'symbol') else sig.get('symbol')
-                    if sig_symbol and sig_symbol.upper() == symbol.upper():
-                        matching_signal = sig
-                        break
-                
-                if matching_signal:
-                    signal_id = matching_signal.id if hasattr(matching_signal, 'id') else matching_signal.get('id')
-                    logger.info(f"Found matching signal {signal_id}")
+                clear_lookup_cache()
+
+                if signal_id:
+                    logger.info("Trade saved as signal {}", signal_id)
                     # Update loading message with success and show signal details
                     await loading_msg.edit_text(
                         f"✅ Trade opened successfully!\n\n"
@@ -241,39 +276,24 @@ class InputHandler:
                     )
                     
                     # Show signal details
-                    from .views import ViewManager
                     view_manager = ViewManager(self.meta_trader, self.user_states)
-                    
-                    # Create a fake query object to use edit_message_text
-                    class FakeQuery:
-                        def __init__(self, message):
-                            self.message = message
-                        
-                        async def edit_message_text(self, *args, **kwargs):
-                            await self.message.edit_text(*args, **kwargs)
-                        
-                        async def answer(self, *args, **kwargs):
-                            pass
-                    
-                    fake_query = FakeQuery(loading_msg)
-                    await view_manager.show_signal_detail(fake_query, user_id, signal_id)
+                    await view_manager.show_signal_detail(_MessageQuery(loading_msg), user_id, signal_id)
                 else:
                     await loading_msg.edit_text(
-                        "✅ Trade executed successfully!\n\n"
-                        "📊 Position details will appear shortly.",
+                        "⚠️ Trade was not opened.\n\n"
+                        "💡 Check logs for details",
                         parse_mode="Markdown"
                     )
                 
-                self.user_states[user_id]["state"] = None
+                self.user_states[user_id].state = None
                 
             except Exception as e:
-                logger.error(f"Error executing trade: {e}", exc_info=True)
+                logger.error("Error executing trade: {}", e, exc_info=True)
                 await loading_msg.edit_text(
                     f"❌ Failed to execute trade:\n\n{str(e)}",
                     parse_mode="Markdown"
                 )
                 
         except Exception as e:
-            logger.error(f"Error in trade input: {e}", exc_info=True)
-            keyboard = [["⬅️ Back to Menu"]]
-            await update.message.reply_text(f"❌ Error: {str(e)}", reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True))
+            logger.error("Error in trade input: {}", e, exc_info=True)
+            await update.message.reply_text(f"❌ Error: {str(e)}", reply_markup=_BACK_TO_MENU_KEYBOARD)
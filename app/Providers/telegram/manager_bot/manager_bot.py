@@ -23,9 +23,9 @@ Button Architecture:
 Uses python-telegram-bot library with async/await for concurrent operation.
 """
 
-from typing import Optional, Dict
+from typing import Optional
 from loguru import logger
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 import asyncio
 
 from Configure.settings.Settings import Settings
@@ -38,6 +38,7 @@ from .handlers import HandlerManager
 from .views import ViewManager
 from .actions import ActionManager
 from .input_handlers import InputHandler
+from .state import UserStateStore
 
 
 class TelegramManagerBot(Provider):
@@ -47,7 +48,7 @@ class TelegramManagerBot(Provider):
         self.settings = settings
         self.app: Optional[Application] = None
         self.meta_trader: Optional[MetaTrader] = None
-        self.user_states: Dict[int, Dict] = {}  # {user_id: {state, context}}
+        self.user_states = UserStateStore(maxsize=10_000, ttl=3600)  # {user_id: UserState(state, context)}
 
         # Initialize managers
         self.views = ViewManager(self.meta_trader, self.user_states)
@@ -101,8 +102,14 @@ class TelegramManagerBot(Provider):
                 logger.error("Bot token not configured in settings")
                 return
 
-            # Create Application with bot token
-            self.app = Application.builder().token(bot_token).build()
+            # Create Application with bot token; outbound calls are throttled to
+            # Telegram's flood limits (needs python-telegram-bot[rate-limiter])
+            builder = Application.builder().token(bot_token)
+            try:
+                builder = builder.rate_limiter(AIORateLimiter())
+            except RuntimeError as e:
+                logger.warning("Rate limiter unavailable, sending unthrottled: {}", e)
+            self.app = builder.build()
 
             # Register handlers
             self.app.add_handler(CommandHandler("start", self.handlers.handle_start))
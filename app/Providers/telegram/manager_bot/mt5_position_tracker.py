@@ -17,9 +17,21 @@ CORRECT APPROACH:
 This module provides helper functions to correctly extract and track position IDs.
 """
 
-from typing import Optional, Dict, Any
+from datetime import datetime, timedelta
+from operator import attrgetter
+from typing import Optional, Dict, Any, Set
 from loguru import logger
 import MetaTrader5 as mt5
+from Database.repository.cache import LRUCache
+
+# MT5 enum values, bound once instead of resolved on the module for every deal
+_TRADE_DONE = mt5.TRADE_RETCODE_DONE
+_DEAL_OUT = mt5.DEAL_ENTRY_OUT
+_DEAL_IN = mt5.DEAL_ENTRY_IN
+
+# verify_position_exists results, so repeated lifecycle checks within one pass skip the MT5 call.
+# Values are wrapped in a 1-tuple because a closed position is cached as None.
+_open_position_cache = LRUCache(max_size=4096, default_ttl=0.5)
 
 
 def extract_position_id_from_trade_result(result) -> Optional[int]:
@@ -42,15 +54,15 @@ def extract_position_id_from_trade_result(result) -> Optional[int]:
         logger.error("[MT5_TRACKER] Trade result is None")
         return None
 
-    if result.retcode != mt5.TRADE_RETCODE_DONE:
+    if result.retcode != _TRADE_DONE:
         logger.warning(f"[MT5_TRACKER] Trade not successful: {result.retcode}")
         return None
 
     # result.order contains the position_id for market orders
     position_id = result.order
 
-    logger.debug(f"[MT5_TRACKER] Extracted position_id: {position_id}")
-    logger.debug(f"[MT5_TRACKER] Trade result details - order: {result.order}, deal: {result.deal}, volume: {result.volume}")
+    logger.debug("[MT5_TRACKER] Extracted position_id: {}", position_id)
+    logger.debug("[MT5_TRACKER] Trade result details - order: {}, deal: {}, volume: {}", result.order, result.deal, result.volume)
 
     # IMPORTANT: result.deal is the DEAL TICKET, not the position ID
     if result.deal != position_id:
@@ -59,6 +71,13 @@ def extract_position_id_from_trade_result(result) -> Optional[int]:
     return position_id
 
 
+def _deal_position_id_getter(deal):
+    """Accessor for a deal's position id, resolved once per batch ('position_id', else 'position')"""
+    if hasattr(deal, 'position_id'):
+        return attrgetter('position_id')
+    return lambda d: getattr(d, 'position', None)
+
+
 def verify_position_exists(position_id: int) -> Optional[Dict[str, Any]]:
     """
     Check if a position is still open in MT5.
@@ -72,13 +91,18 @@ def verify_position_exists(position_id: int) -> Optional[Dict[str, Any]]:
     if not position_id:
         return None
 
+    cache_key = str(position_id)
+    cached = _open_position_cache.get(cache_key)
+    if cached is not None:
+        return cached[0]
+
     try:
         positions = mt5.positions_get(ticket=position_id)
 
         if positions and len(positions) > 0:
             pos = positions[0]
-            logger.debug(f"[MT5_TRACKER] Position {position_id} is OPEN - Symbol: {pos.symbol}, Profit: {pos.profit}")
-            return {
+            logger.debug("[MT5_TRACKER] Position {} is OPEN - Symbol: {}, Profit: {}", position_id, pos.symbol, pos.profit)
+            position_data = {
                 'position_id': pos.ticket,
                 'symbol': pos.symbol,
                 'type': pos.type,
@@ -91,8 +115,11 @@ def verify_position_exists(position_id: int) -> Optional[Dict[str, Any]]:
                 'time': pos.time
             }
         else:
-            logger.debug(f"[MT5_TRACKER] Position {position_id} is CLOSED or not found")
-            return None
+            logger.debug("[MT5_TRACKER] Position {} is CLOSED or not found", position_id)
+            position_data = None
+
+        _open_position_cache.put(cache_key, (position_data,))
+        return position_data
 
     except Exception as e:
         logger.error(f"[MT5_TRACKER] Error checking position {position_id}: {e}")
@@ -110,8 +137,6 @@ def get_closed_position_from_history(position_id: int, days_back: int = 30) -> O
     Returns:
         Dict with exit deal information if found, None otherwise
     """
-    from datetime import datetime, timedelta
-
     if not position_id:
         logger.error("[MT5_TRACKER] position_id is None")
         return None
@@ -121,32 +146,34 @@ def get_closed_position_from_history(position_id: int, days_back: int = 30) -> O
         to_date = datetime.now()
         from_date = to_date - timedelta(days=days_back)
 
-        logger.debug(f"[MT5_TRACKER] Searching history for position_id {position_id} from {from_date} to {to_date}")
+        logger.debug("[MT5_TRACKER] Searching history for position_id {} from {} to {}", position_id, from_date, to_date)
 
-        deals = mt5.history_deals_get(from_date, to_date)
+        # Let MT5 filter by position; only scan the whole range if that call fails
+        deals = mt5.history_deals_get(position=position_id)
+        if deals is None:
+            logger.opt(lazy=True).debug("[MT5_TRACKER] Position filter unavailable ({}), scanning date range", mt5.last_error)
+            deals = mt5.history_deals_get(from_date, to_date)
         if not deals:
             logger.warning(f"[MT5_TRACKER] No deals found in history")
             return None
 
-        # Find the DEAL_ENTRY_OUT deal for this position
+        # Find the DEAL_ENTRY_OUT deal for this position. Scan newest first so the
+        # first match of each kind is the latest one, and stop once both are found.
         exit_deal = None
         entry_deal = None
 
-        for deal in deals:
-            if hasattr(deal, 'position_id'):
-                deal_position_id = deal.position_id
-            elif hasattr(deal, 'position'):
-                deal_position_id = deal.position
-            else:
-                continue
+        get_position_id = _deal_position_id_getter(deals[0])
 
-            if deal_position_id == position_id:
-                if deal.entry == mt5.DEAL_ENTRY_OUT:
+        for deal in reversed(deals):
+            if get_position_id(deal) == position_id:
+                if exit_deal is None and deal.entry == _DEAL_OUT:
                     exit_deal = deal
-                    logger.debug(f"[MT5_TRACKER] Found EXIT deal for position {position_id} - Deal ticket: {deal.ticket}, Price: {deal.price}, Profit: {deal.profit}")
-                elif deal.entry == mt5.DEAL_ENTRY_IN:
+                    logger.debug("[MT5_TRACKER] Found EXIT deal for position {} - Deal ticket: {}, Price: {}, Profit: {}", position_id, deal.ticket, deal.price, deal.profit)
+                elif entry_deal is None and deal.entry == _DEAL_IN:
                     entry_deal = deal
-                    logger.debug(f"[MT5_TRACKER] Found ENTRY deal for position {position_id} - Deal ticket: {deal.ticket}, Price: {deal.price}")
+                    logger.debug("[MT5_TRACKER] Found ENTRY deal for position {} - Deal ticket: {}, Price: {}", position_id, deal.ticket, deal.price)
+                if exit_deal and entry_deal:
+                    break
 
         if exit_deal:
             return {
@@ -183,7 +210,7 @@ def get_position_lifecycle_info(position_id: int) -> Dict[str, Any]:
     Returns:
         Dict with 'state' and 'data' keys
     """
-    logger.debug(f"[MT5_TRACKER] Getting lifecycle info for position_id: {position_id}")
+    logger.debug("[MT5_TRACKER] Getting lifecycle info for position_id: {}", position_id)
 
     # First check if position is still open
     open_data = verify_position_exists(position_id)
@@ -212,6 +239,26 @@ def get_position_lifecycle_info(position_id: int) -> Dict[str, Any]:
     }
 
 
+# Number of stored positions validate_database_position_ids checks against MT5
+VALIDATION_SAMPLE_SIZE = 10
+
+
+def _open_position_ids() -> Set[int]:
+    """Tickets (position IDs) of every currently open MT5 position"""
+    positions = mt5.positions_get()
+    return {pos.ticket for pos in positions} if positions else set()
+
+
+def _closed_position_ids_in_history(days_back: int = 30) -> Set[int]:
+    """Position IDs that have an exit deal in the last `days_back` days of MT5 history"""
+    to_date = datetime.now()
+    deals = mt5.history_deals_get(to_date - timedelta(days=days_back), to_date)
+    if not deals:
+        return set()
+    get_position_id = _deal_position_id_getter(deals[0])
+    return {get_position_id(deal) for deal in deals if deal.entry == _DEAL_OUT}
+
+
 def validate_database_position_ids(db_manager) -> Dict[str, Any]:
     """
     Diagnostic function to validate all position_ids in database.
@@ -229,29 +276,31 @@ def validate_database_position_ids(db_manager) -> Dict[str, Any]:
 
     try:
         position_repo = db_manager.get_position_repository()
-        all_positions = position_repo.get_all_positions()
+        sample_positions = position_repo.get_positions_sample(VALIDATION_SAMPLE_SIZE)
 
         results = {
-            'total_positions': len(all_positions),
+            'total_positions': position_repo.count_positions(),
             'valid_ids': 0,
             'invalid_ids': 0,
             'not_found': 0,
             'issues': []
         }
 
-        for db_pos in all_positions[:10]:  # Check first 10 for sample
-            position_id = db_pos.position_id if hasattr(db_pos, 'position_id') else db_pos.get('position_id')
+        # One MT5 call for every open position and one for the history window,
+        # instead of a lifecycle lookup (two calls) per sampled position
+        known_ids = _open_position_ids() | _closed_position_ids_in_history()
 
-            lifecycle = get_position_lifecycle_info(position_id)
+        for db_pos in sample_positions:
+            position_id = db_pos.position_id
 
-            if lifecycle['state'] in ['OPEN', 'CLOSED']:
+            if position_id and position_id in known_ids:
                 results['valid_ids'] += 1
-            elif lifecycle['state'] == 'NOT_FOUND':
+            else:
                 results['not_found'] += 1
                 results['issues'].append({
-                    'db_id': db_pos.id if hasattr(db_pos, 'id') else db_pos.get('id'),
+                    'db_id': db_pos.id,
                     'stored_position_id': position_id,
-                    'signal_id': db_pos.signal_id if hasattr(db_pos, 'signal_id') else db_pos.get('signal_id'),
+                    'signal_id': db_pos.signal_id,
                     'issue': 'Position ID not found in MT5 - may be deal/order ticket instead of position_id'
                 })
 
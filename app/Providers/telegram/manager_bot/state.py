@@ -0,0 +1,73 @@
+"""
+Per-user conversation state
+"""
+
+import time
+from collections import OrderedDict
+
+
+class UserState:
+    """Current state name and free-form context for a single user"""
+
+    __slots__ = ("state", "context")
+
+    def __init__(self, state=None, context=None):
+        self.state = state
+        self.context = context if context is not None else {}
+
+
+class UserStateStore:
+    """Bounded LRU mapping of user_id -> UserState
+
+    Sessions idle for longer than ttl seconds are dropped, and the least recently
+    used session is evicted once maxsize is exceeded. A dropped user simply starts
+    again from the main menu on their next message (/start resets state anyway).
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # {user_id: (UserState, last_access)}
+
+    def _lookup(self, user_id):
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry[1] > self.ttl:
+            del self._data[user_id]
+            return None
+        self._data[user_id] = (entry[0], now)
+        self._data.move_to_end(user_id)
+        return entry[0]
+
+    def get(self, user_id, default=None):
+        user_state = self._lookup(user_id)
+        return default if user_state is None else user_state
+
+    def __getitem__(self, user_id):
+        user_state = self._lookup(user_id)
+        if user_state is None:
+            raise KeyError(user_id)
+        return user_state
+
+    def __setitem__(self, user_id, user_state) -> None:
+        now = time.monotonic()
+        self._data[user_id] = (user_state, now)
+        self._data.move_to_end(user_id)
+
+        # Oldest entries sit at the front: drop expired ones, then trim to maxsize
+        while self._data:
+            oldest_id, (_, last_access) = next(iter(self._data.items()))
+            if now - last_access <= self.ttl and len(self._data) <= self.maxsize:
+                break
+            del self._data[oldest_id]
+
+    def __delitem__(self, user_id) -> None:
+        del self._data[user_id]
+
+    def __contains__(self, user_id) -> bool:
+        return self._lookup(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,8 +4,10 @@ Structure visualization of refactored manager_bot package
 Run: python structure.py
 """
 
-def show_structure():
-    structure = """
+import sys
+from functools import lru_cache
+
+_STRUCTURE = """
     ╔════════════════════════════════════════════════════════════════════════════╗
     ║         TELEGRAM MANAGER BOT - REFACTORED MODULAR STRUCTURE               ║
     ╚════════════════════════════════════════════════════════════════════════════╝
@@ -50,7 +52,7 @@ def show_structure():
         │       └── handle_tester_input()      - Parse signal text
         │
         ├── helpers.py                         ★ DATABASE & UTILITIES (45 lines)
-        │   ├── find_signal_by_ticket()        - Signal lookup by MT5 ticket
+        │   ├── find_signals_by_tickets()      - Batched signal lookup by MT5 tickets
         │   └── get_position_for_signal()      - MT5 position lookup by signal
         │
         └── README.md                          ← Detailed documentation
@@ -214,8 +216,27 @@ def show_structure():
     ✓ Separation of Concerns
       Views, Actions, Input validation are completely separated
 
-    """
-    print(structure)
+    
+"""  # trailing newline baked in so show_structure() is a single write()
+
+
+@lru_cache(maxsize=None)
+def _encoded_structure(encoding: str, errors: str) -> bytes:
+    """The diagram encoded once per output encoding and error handler"""
+    return _STRUCTURE.encode(encoding, errors)
+
+
+def show_structure(out=None):
+    out = out or sys.stdout
+    buffer = getattr(out, "buffer", None)
+    if buffer is None:
+        # Wrapped/redirected text stream without a byte layer
+        out.write(_STRUCTURE)
+        return
+    out.flush()
+    # Honour the stream's error handler (e.g. PYTHONIOENCODING=cp1252:replace) as print() would
+    buffer.write(_encoded_structure(out.encoding or "utf-8", getattr(out, "errors", None) or "strict"))
+    buffer.flush()
 
 if __name__ == "__main__":
     show_structure()
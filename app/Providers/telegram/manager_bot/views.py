@@ -2,46 +2,25 @@
 View methods for displaying UI messages and inline buttons
 """
 
-from typing import Optional
+from typing import Final, Optional
 from loguru import logger
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Message, ReplyKeyboardRemove
 from telegram.ext import ContextTypes
 from datetime import datetime
+import calendar
 import MetaTrader5 as mt5
 import asyncio
+import time
+from operator import attrgetter
 
 from Database.database_manager import db_manager
-from .helpers import find_signal_by_ticket, get_position_for_signal
+from Database.repository.cache import LRUCache
+from .helpers import back_button, find_signals_by_tickets, get_field, get_position_for_signal, run_mt
+from .state import UserState, UserStateStore
 from report import ChannelAnalyzer
 
-
-class ViewManager:
-    """Manages all UI display methods"""
-
-    def __init__(self, meta_trader, user_states: dict):
-        self.meta_trader = meta_trader
-        self.user_states = user_states
-        # Track active auto-updates: {user_id: {"state": "signal_list", "message_id": 123, "chat_id": 456}}
-        self.active_updates = {}
-        self.update_interval = 5  # Update every 5 seconds
-
-    def _stop_auto_update(self, user_id: int) -> None:
-        """Stop auto-update for a user"""
-        if user_id in self.active_updates:
-            del self.active_updates[user_id]
-
-    async def show_open_trade_form(self, query, user_id: int) -> None:
-        """Show form to open a new manual trade"""
-        try:
-            from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove
-
-            # Set user state to awaiting trade input
-            self.user_states[user_id] = {
-                "state": "awaiting_trade_input",
-                "context": {}
-            }
-
-            text = """📝 **Open New Trade**
+# Static screens, shared by every user
+_OPEN_TRADE_FORM_TEXT: Final = """📝 **Open New Trade**
 
 Please provide trade details in the following format:
 
@@ -63,147 +42,276 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
 - **SL**: Stop loss level
 - **COMMENT**: Optional comment (e.g., Manual entry)
 """
+_TESTER_TEXT: Final = """🧪 **Signal Tester**
+
+Send a signal text to parse:
+
+**Example:**
+`EUR/USD BUY 1.2500 SL: 1.2450 TP: 1.2550, 1.2600`
+
+Will export:
+• Open Price
+• Second Price
+• Stop Loss
+• Take Profit List"""
+_REMOVE_KEYBOARD: Final = ReplyKeyboardRemove()
+
+
+# Open-position card shared by the signal entry and position detail views
+_POSITION_CARD: Final = """📍 **Position**
+
+**Ticket:** #{ticket}
+**Symbol:** {symbol}
+**Open:** {open_price} | **Current:** {current_price}
+**SL:** {stop_loss} | **TP:** {take_profit}
+**Lots:** {lots}
+
+{pnl_emoji} **P&L:** ${pnl:.2f}{signal_info}"""
+
+_ticket_getter = attrgetter("ticket")
+
+
+def _tickets(items) -> list:
+    """Tickets of MT5 positions/orders; named tuples take the C attrgetter path, dict rows fall back to get_field"""
+    if not items:
+        return []
+    if isinstance(items[0], tuple):
+        return list(map(_ticket_getter, items))
+    return [get_field(item, "ticket") for item in items]
+
+
+def _entry_emoji(tickets, position_tickets, order_tickets) -> str:
+    """📈 if the entry's first ticket is an open position, ⏳ if a pending order, ❌ if gone"""
+    if not tickets:
+        return "❌"
+    ticket = int(tickets[0])
+    if ticket in position_tickets:
+        return "📈"
+    return "⏳" if ticket in order_tickets else "❌"
+
+
+class ViewManager:
+    """Manages all UI display methods"""
+
+    # Seconds a rendered trade summary is reused across refresh presses
+    SUMMARY_CACHE_TTL = 2.0
+
+    def __init__(self, meta_trader, user_states: UserStateStore):
+        self.meta_trader = meta_trader
+        self.user_states = user_states
+        # Track active auto-updates: {user_id: {"state": "signal_list", "message_id": 123, "chat_id": 456}}
+        self.active_updates = {}
+        self.update_interval = 5  # Update every 5 seconds
+        # Last render per message: {"chat_id:message_id": (render_hash, edit_date)}
+        self._last_render = LRUCache(max_size=4096, default_ttl=600)
+        # Shared ticker refreshing every subscribed signal list, None while nobody is subscribed
+        self._signal_list_task = None
+        # (monotonic time, text) of the last trade summary; the account is shared by all users
+        self._summary_cache = None
+
+        # Static menu keyboards, built once and reused for every reply
+        self._history_menu_markup = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("📅 Today", callback_data="history_today"),
+                InlineKeyboardButton("📆 Yesterday", callback_data="history_yesterday"),
+            ],
+            [
+                InlineKeyboardButton("🗓️ Calendar", callback_data="history_calendar"),
+            ],
+            [InlineKeyboardButton("⬅️ Back", callback_data="menu")]
+        ])
+        self._analyze_menu_markup = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("📅 All Time", callback_data="analyze_all"),
+                InlineKeyboardButton("📆 This Week", callback_data="analyze_week"),
+            ],
+            [
+                InlineKeyboardButton("📅 This Month", callback_data="analyze_month"),
+                InlineKeyboardButton("📅 Last 30 Days", callback_data="analyze_30days"),
+            ],
+            [
+                InlineKeyboardButton("⬅️ Back to Menu", callback_data="menu"),
+            ],
+        ])
+
+    async def _edit(self, query, text: str, reply_markup=None, **kwargs) -> None:
+        """edit_message_text, skipped when the message already shows this exact render
+
+        A repeated button press would otherwise resend an identical edit, which
+        Telegram rejects ("Message is not modified") and counts against flood limits.
+        The stored edit_date must still match the message, so an edit made by any
+        other path (auto-update, actions) forces a fresh render.
+        """
+        message = getattr(query, "message", None)
+        key = render = None
+        if message is not None and getattr(message, "message_id", None):
+            key = f"{message.chat_id}:{message.message_id}"
+            render = hash((text, kwargs.get("parse_mode"), reply_markup))
+            edit_date = getattr(message, "edit_date", None)
+            if (edit_date is not None and self._last_render.get(key) == (render, edit_date)
+                    and message.reply_markup == reply_markup):
+                return
+
+        result = await query.edit_message_text(text, reply_markup=reply_markup, **kwargs)
+        if key and isinstance(result, Message):
+            self._last_render.put(key, (render, result.edit_date))
+
+    def _fetch_positions_and_orders(self):
+        """Open positions and pending orders (blocking; runs on the MT5 thread)"""
+        positions = self.meta_trader.get_open_positions()
+        orders = self.meta_trader.get_pending_orders()
+        return positions or [], orders or []
+
+    def _fetch_account_snapshot(self):
+        """Account info plus open positions and pending orders (blocking; runs on the MT5 thread)"""
+        account_info = mt5.account_info()
+        return (account_info, *self._fetch_positions_and_orders())
+
+    async def _positions_and_orders(self):
+        """Open positions and pending orders, fetched in one MT5 thread hop"""
+        return await run_mt(self._fetch_positions_and_orders)
+
+    async def _account_snapshot(self):
+        """Account info plus open positions and pending orders, fetched in one MT5 thread hop"""
+        return await run_mt(self._fetch_account_snapshot)
+
+    def _stop_auto_update(self, user_id: int) -> None:
+        """Stop auto-update for a user"""
+        if user_id in self.active_updates:
+            del self.active_updates[user_id]
+
+    async def show_open_trade_form(self, query, user_id: int) -> None:
+        """Show form to open a new manual trade"""
+        try:
+            # Set user state to awaiting trade input
+            self.user_states[user_id] = UserState("awaiting_trade_input")
 
             # Send a new message without keyboard buttons
             try:
                 await query.message.reply_text(
-                    text,
+                    _OPEN_TRADE_FORM_TEXT,
                     parse_mode="Markdown",
-                    reply_markup=ReplyKeyboardRemove()
+                    reply_markup=_REMOVE_KEYBOARD
                 )
 
             except AttributeError as e:
-                logger.error(f"Error accessing query.message: {e}")
+                logger.error("Error accessing query.message: {}", e)
                 # Fallback: edit the message with text only and edit the button state
-                await query.edit_message_text(text, parse_mode="Markdown")
+                await self._edit(query, _OPEN_TRADE_FORM_TEXT, parse_mode="Markdown")
             except Exception as e:
-                logger.error(f"Error sending trade form: {e}")
-                await query.edit_message_text(text, parse_mode="Markdown")
+                logger.error("Error sending trade form: {}", e)
+                await self._edit(query, _OPEN_TRADE_FORM_TEXT, parse_mode="Markdown")
         except Exception as e:
-            logger.error(f"Error showing open trade form: {e}")
+            logger.error("Error showing open trade form: {}", e)
             await query.answer(f"Error: {str(e)}", show_alert=True)
 
+    async def _group_by_signal(self, positions, orders) -> dict:
+        """{signal_id: {"signal", "positions", "orders"}} for tickets linked to a signal"""
+        # Resolve every ticket in one query
+        signals_by_ticket = await run_mt(
+            find_signals_by_tickets, _tickets(positions) + _tickets(orders))
+        signals_dict = {}
+
+        for pos in positions:
+            ticket = get_field(pos, "ticket")
+            signal = signals_by_ticket.get(ticket)
+            if signal:
+                signal_id = get_field(signal, "id")
+                entry = signals_dict.get(signal_id)
+                if entry is None:
+                    entry = signals_dict[signal_id] = {"signal": signal, "positions": [], "orders": []}
+                entry["positions"].append({"ticket": ticket, "data": pos})
+
+        for order in orders:
+            ticket = get_field(order, "ticket")
+            signal = signals_by_ticket.get(ticket)
+            if signal:
+                signal_id = get_field(signal, "id")
+                entry = signals_dict.get(signal_id)
+                if entry is None:
+                    entry = signals_dict[signal_id] = {"signal": signal, "positions": [], "orders": []}
+                entry["orders"].append({"ticket": ticket, "data": order})
+
+        return signals_dict
+
+    @staticmethod
+    def _render_signal_groups(signals_dict: dict, header: str):
+        """Signal list text and button rows for grouped positions/orders"""
+        text_parts = [header]
+        buttons = []
+
+        for signal_id, signal_data in signals_dict.items():
+            signal = signal_data["signal"]
+            signal_type = get_field(signal, "signal_type", "N/A")
+            num_positions = len(signal_data["positions"])
+            num_orders = len(signal_data["orders"])
+
+            # Get channel and message info
+            channel_title = get_field(signal, "telegram_channel_title", "Unknown")
+            message_link = get_field(signal, "message_link") or "N/A"
+
+            # Get ticket IDs from positions and orders
+            all_tickets = [pos["ticket"] for pos in signal_data["positions"]] + \
+                [order["ticket"] for order in signal_data["orders"]]
+            tickets_text = " / ".join(str(t) for t in all_tickets) if all_tickets else "None"
+
+            # Add signal type emoji
+            type_emoji = "🟢" if signal_type == "BUY" else "🔴"
+
+            text_parts.append(
+                f"\n**#{signal_id}:**\n"
+                f"**Channel:** {channel_title}\n"
+                f"**Message:** [{message_link}]({message_link})\n"
+                f"{type_emoji} **{signal_type} | Tickets: {tickets_text}**\n"
+                f"  📈 Positions: {num_positions} | ⏳ Orders: {num_orders}")
+
+            button_text = f"{type_emoji} #{signal_id} - {channel_title}"
+            buttons.append([InlineKeyboardButton(
+                button_text, callback_data=f"signal_{signal_id}")])
+
+        buttons.append([InlineKeyboardButton(
+            "⬅️ Back", callback_data="menu")])
+        return "\n".join(text_parts), buttons
+
     async def show_signal_list(self, query, user_id: int) -> None:
         """Show list of active signals grouped by signal with their positions/orders"""
         try:
             STATE_SIGNAL_LIST = "signal_list"
-            self.user_states[user_id] = {
-                "state": STATE_SIGNAL_LIST, "context": {}}
+            self.user_states[user_id] = UserState(STATE_SIGNAL_LIST)
 
             if not self.meta_trader:
-                await query.edit_message_text(
+                await self._edit(
+                    query,
                     "❌ MetaTrader connection not available",
-                    reply_markup=InlineKeyboardMarkup(
-                        [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]])
+                    reply_markup=back_button("menu")
                 )
                 return
 
-            positions = self.meta_trader.get_open_positions() or []
-            orders = self.meta_trader.get_pending_orders() or []
+            positions, orders = await self._positions_and_orders()
 
             if not positions and not orders:
-                await query.edit_message_text(
+                await self._edit(
+                    query,
                     "📭 No active positions or orders",
-                    reply_markup=InlineKeyboardMarkup(
-                        [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]])
+                    reply_markup=back_button("menu")
                 )
                 return
 
-            # Group positions/orders by signal
-            signals_dict = {}
-
-            for pos in positions:
-                ticket = pos.ticket if hasattr(
-                    pos, 'ticket') else pos.get("ticket")
-                signal = find_signal_by_ticket(ticket)
-                if signal:
-                    signal_id = signal.id if hasattr(
-                        signal, 'id') else signal.get("id")
-                    if signal_id not in signals_dict:
-                        signals_dict[signal_id] = {
-                            "signal": signal, "positions": [], "orders": []}
-                    signals_dict[signal_id]["positions"].append(
-                        {"ticket": ticket, "data": pos})
-
-            for order in orders:
-                ticket = order.ticket if hasattr(
-                    order, 'ticket') else order.get("ticket")
-                signal = find_signal_by_ticket(ticket)
-                if signal:
-                    signal_id = signal.id if hasattr(
-                        signal, 'id') else signal.get("id")
-                    if signal_id not in signals_dict:
-                        signals_dict[signal_id] = {
-                            "signal": signal, "positions": [], "orders": []}
-                    signals_dict[signal_id]["orders"].append(
-                        {"ticket": ticket, "data": order})
+            signals_dict = await self._group_by_signal(positions, orders)
 
             if not signals_dict:
-                await query.edit_message_text(
+                await self._edit(
+                    query,
                     "📭 No active positions or orders linked to signals",
-                    reply_markup=InlineKeyboardMarkup(
-                        [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]])
+                    reply_markup=back_button("menu")
                 )
                 return
 
-            # Build text and buttons grouped by signal
-            text_parts = ["📊 **Active Signals - Grouped by Signal**\n"]
-            buttons = []
-
-            for signal_id, signal_data in signals_dict.items():
-                signal = signal_data["signal"]
-                open_price = signal.open_price if hasattr(
-                    signal, 'open_price') else signal.get("open_price", "N/A")
-                signal_type = signal.signal_type if hasattr(
-                    signal, 'signal_type') else signal.get("signal_type", "N/A")
-                num_positions = len(signal_data["positions"])
-                num_orders = len(signal_data["orders"])
-
-                # Get channel and message info
-                channel_title = signal.telegram_channel_title if hasattr(
-                    signal, 'telegram_channel_title') else signal.get("telegram_channel_title", "Unknown")
-                chat_id = signal.telegram_message_chatid if hasattr(
-                    signal, 'telegram_message_chatid') else signal.get("telegram_message_chatid")
-                message_id = signal.telegram_message_id if hasattr(
-                    signal, 'telegram_message_id') else signal.get("telegram_message_id")
-
-                # Build message link
-                message_link = "N/A"
-                if chat_id and message_id:
-                    message_link = f"https://t.me/c/{abs(chat_id)}/{message_id}"
-
-                # Get ticket IDs from positions and orders
-                position_tickets = [pos["ticket"]
-                                    for pos in signal_data["positions"]]
-                order_tickets = [order["ticket"]
-                                 for order in signal_data["orders"]]
-                all_tickets = position_tickets + order_tickets
-                tickets_text = " / ".join(str(t)
-                                          for t in all_tickets) if all_tickets else "None"
-
-                # Add signal type emoji
-                type_emoji = "🟢" if signal_type == "BUY" else "🔴"
-
-                text_parts.append(f"\n**#{signal_id}:**")
-                text_parts.append(f"**Channel:** {channel_title}")
-                text_parts.append(
-                    f"**Message:** [{message_link}]({message_link})")
-                text_parts.append(
-                    f"{type_emoji} **{signal_type} | Tickets: {tickets_text}**")
-                text_parts.append(
-                    f"  📈 Positions: {num_positions} | ⏳ Orders: {num_orders}")
-
-                button_text = f"{type_emoji} #{signal_id} - {channel_title}"
-                buttons.append([InlineKeyboardButton(
-                    button_text, callback_data=f"signal_{signal_id}")])
-
-            buttons.append([InlineKeyboardButton(
-                "⬅️ Back", callback_data="menu")])
-
-            text = "\n".join(text_parts)
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            text, buttons = self._render_signal_groups(
+                signals_dict, "📊 **Active Signals - Grouped by Signal**\n")
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
 
-            # Store message info for auto-update
+            # Subscribe this message to the shared signal list ticker
             self.active_updates[user_id] = {
                 "state": "signal_list",
                 "message_id": query.message.message_id,
@@ -212,229 +320,145 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 "last_buttons": buttons
             }
 
-            # Start auto-update task for this user
-            asyncio.create_task(
-                self._auto_update_signal_list(user_id, query.get_bot()))
+            if self._signal_list_task is None:
+                self._signal_list_task = asyncio.create_task(
+                    self._auto_update_signal_list(query.get_bot()))
 
         except Exception as e:
-            logger.error(f"Error showing signal list: {e}")
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]))
+            logger.error("Error showing signal list: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("menu"))
+
+    def _signal_list_subscribers(self) -> list:
+        """(user_id, update_info) for every message currently following the signal list"""
+        return [(user_id, info) for user_id, info in self.active_updates.items()
+                if info["state"] == "signal_list"]
 
-    async def _auto_update_signal_list(self, user_id: int, bot) -> None:
-        """Automatically update signal list for user every 5 seconds"""
+    async def _auto_update_signal_list(self, bot) -> None:
+        """Refresh every subscribed signal list every update_interval seconds
+
+        One task serves all viewers: positions/orders are fetched and the list is
+        rendered once per tick, then edited into each subscriber's message whose
+        content differs. The task exits once nobody is subscribed.
+        """
         try:
-            while user_id in self.active_updates and self.active_updates[user_id]["state"] == "signal_list":
+            while True:
                 await asyncio.sleep(self.update_interval)
 
-                # Check if user is still on signal_list page
-                if user_id not in self.active_updates or self.active_updates[user_id]["state"] != "signal_list":
+                # No await between this check and clearing the task handle, so a new
+                # subscriber either sees this task still running or starts a fresh one
+                if not self._signal_list_subscribers():
                     break
 
-                update_info = self.active_updates[user_id]
-
                 if not self.meta_trader:
                     continue
 
-                positions = self.meta_trader.get_open_positions() or []
-                orders = self.meta_trader.get_pending_orders() or []
+                positions, orders = await self._positions_and_orders()
 
                 if not positions and not orders:
                     text = "📭 No active positions or orders"
                     buttons = [[InlineKeyboardButton(
                         "⬅️ Back", callback_data="menu")]]
                 else:
-                    # Group positions/orders by signal
-                    signals_dict = {}
-
-                    for pos in positions:
-                        ticket = pos.ticket if hasattr(
-                            pos, 'ticket') else pos.get("ticket")
-                        signal = find_signal_by_ticket(ticket)
-                        if signal:
-                            signal_id = signal.id if hasattr(
-                                signal, 'id') else signal.get("id")
-                            if signal_id not in signals_dict:
-                                signals_dict[signal_id] = {
-                                    "signal": signal, "positions": [], "orders": []}
-                            signals_dict[signal_id]["positions"].append(
-                                {"ticket": ticket, "data": pos})
-
-                    for order in orders:
-                        ticket = order.ticket if hasattr(
-                            order, 'ticket') else order.get("ticket")
-                        signal = find_signal_by_ticket(ticket)
-                        if signal:
-                            signal_id = signal.id if hasattr(
-                                signal, 'id') else signal.get("id")
-                            if signal_id not in signals_dict:
-                                signals_dict[signal_id] = {
-                                    "signal": signal, "positions": [], "orders": []}
-                            signals_dict[signal_id]["orders"].append(
-                                {"ticket": ticket, "data": order})
+                    signals_dict = await self._group_by_signal(positions, orders)
 
                     if not signals_dict:
                         text = "📭 No active positions or orders linked to signals"
                         buttons = [[InlineKeyboardButton(
                             "⬅️ Back", callback_data="menu")]]
                     else:
-                        # Build updated text and buttons
-                        text_parts = [
-                            "📊 **Active Signals - Grouped by Signal** 🔄 (Auto-updating)\n"]
-                        buttons = []
-
-                        for signal_id, signal_data in signals_dict.items():
-                            signal = signal_data["signal"]
-                            signal_type = signal.signal_type if hasattr(
-                                signal, 'signal_type') else signal.get("signal_type", "N/A")
-                            num_positions = len(signal_data["positions"])
-                            num_orders = len(signal_data["orders"])
-
-                            # Get channel and message info
-                            channel_title = signal.telegram_channel_title if hasattr(
-                                signal, 'telegram_channel_title') else signal.get("telegram_channel_title", "Unknown")
-                            chat_id = signal.telegram_message_chatid if hasattr(
-                                signal, 'telegram_message_chatid') else signal.get("telegram_message_chatid")
-                            message_id = signal.telegram_message_id if hasattr(
-                                signal, 'telegram_message_id') else signal.get("telegram_message_id")
-
-                            # Build message link
-                            message_link = "N/A"
-                            if chat_id and message_id:
-                                message_link = f"https://t.me/c/{abs(chat_id)}/{message_id}"
-
-                            # Get ticket IDs
-                            position_tickets = [pos["ticket"]
-                                                for pos in signal_data["positions"]]
-                            order_tickets = [order["ticket"]
-                                             for order in signal_data["orders"]]
-                            all_tickets = position_tickets + order_tickets
-                            tickets_text = " / ".join(str(t)
-                                                      for t in all_tickets) if all_tickets else "None"
-
-                            # Add signal type emoji
-                            type_emoji = "🟢" if signal_type == "BUY" else "🔴"
-
-                            text_parts.append(f"\n**#{signal_id}:**")
-                            text_parts.append(f"**Channel:** {channel_title}")
-                            text_parts.append(
-                                f"**Message:** [{message_link}]({message_link})")
-                            text_parts.append(
-                                f"{type_emoji} **{signal_type} | Tickets: {tickets_text}**")
-                            text_parts.append(
-                                f"  📈 Positions: {num_positions} | ⏳ Orders: {num_orders}")
-
-                            button_text = f"{type_emoji} #{signal_id} - {channel_title}"
-                            buttons.append([InlineKeyboardButton(
-                                button_text, callback_data=f"signal_{signal_id}")])
-
-                        buttons.append([InlineKeyboardButton(
-                            "⬅️ Back", callback_data="menu")])
-                        text = "\n".join(text_parts)
+                        text, buttons = self._render_signal_groups(
+                            signals_dict, "📊 **Active Signals - Grouped by Signal** 🔄 (Auto-updating)\n")
 
-                # Only update if content has changed
-                content_changed = (update_info.get("last_text") != text or
-                                   update_info.get("last_buttons") != buttons)
+                # Only update messages whose content has changed
+                stale = [(user_id, info) for user_id, info in self._signal_list_subscribers()
+                         if info.get("last_text") != text or info.get("last_buttons") != buttons]
+                if not stale:
+                    continue
 
-                if content_changed:
-                    # Update the message
-                    try:
-                        await bot.edit_message_text(
-                            chat_id=update_info["chat_id"],
-                            message_id=update_info["message_id"],
-                            text=text,
-                            parse_mode="Markdown",
-                            reply_markup=InlineKeyboardMarkup(buttons)
-                        )
-                        # Update stored content for next comparison
-                        update_info["last_text"] = text
-                        update_info["last_buttons"] = buttons
-                    except Exception as e:
+                markup = InlineKeyboardMarkup(buttons)
+                results = await asyncio.gather(*(
+                    bot.edit_message_text(
+                        chat_id=info["chat_id"],
+                        message_id=info["message_id"],
+                        text=text,
+                        parse_mode="Markdown",
+                        reply_markup=markup
+                    ) for _, info in stale), return_exceptions=True)
+
+                for (user_id, info), result in zip(stale, results):
+                    if isinstance(result, Exception):
                         logger.debug(
-                            f"Could not update signal list for user {user_id}: {e}")
-                        # Stop updating if message no longer exists
-                        if user_id in self.active_updates:
+                            "Could not update signal list for user {}: {}", user_id, result)
+                        # Stop updating if message no longer exists (unless the user already moved on)
+                        if self.active_updates.get(user_id) is info:
                             del self.active_updates[user_id]
-                        break
+                    else:
+                        # Update stored content for next comparison
+                        info["last_text"] = text
+                        info["last_buttons"] = buttons
 
         except Exception as e:
-            logger.error(f"Error in auto-update signal list: {e}")
-            if user_id in self.active_updates:
+            logger.error("Error in auto-update signal list: {}", e)
+            for user_id, _ in self._signal_list_subscribers():
                 del self.active_updates[user_id]
+        finally:
+            self._signal_list_task = None
 
     async def show_signal_detail(self, query, user_id: int, signal_id: int) -> None:
         """Show signal details with message link and action buttons"""
         try:
             STATE_VIEWING_SIGNAL = "viewing_signal"
-            self.user_states[user_id] = {
-                "state": STATE_VIEWING_SIGNAL, "context": {"signal_id": signal_id}}
+            self.user_states[user_id] = UserState(STATE_VIEWING_SIGNAL, {"signal_id": signal_id})
 
             # Stop auto-update for this user
             self._stop_auto_update(user_id)
 
             signal_repo = db_manager.get_signal_repository()
-            signal = signal_repo.get_signal_by_id(signal_id)
+            signal = await run_mt(signal_repo.get_signal_by_id, signal_id)
             if not signal:
-                await query.edit_message_text("❌ Signal not found", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="signals")]]))
+                await self._edit(query, "❌ Signal not found", reply_markup=back_button("signals"))
                 return
 
-            position = get_position_for_signal(self.meta_trader, signal_id)
-
-            entry_price = signal.open_price if hasattr(
-                signal, 'open_price') else signal.get("open_price", "N/A")
-            second_price = signal.second_price if hasattr(
-                signal, 'second_price') else signal.get("second_price")
-            stop_loss = signal.stop_loss if hasattr(
-                signal, 'stop_loss') else signal.get("stop_loss", "N/A")
-            tp_list = signal.tp_list if hasattr(
-                signal, 'tp_list') else signal.get("tp_list", "N/A")
-            signal_type = signal.signal_type if hasattr(
-                signal, 'signal_type') else signal.get("signal_type", "N/A")
-            channel = signal.telegram_channel_title if hasattr(
-                signal, 'telegram_channel_title') else signal.get("telegram_channel_title", "Unknown")
-            message_id = signal.telegram_message_id if hasattr(
-                signal, 'telegram_message_id') else signal.get("telegram_message_id")
-            chat_id = signal.telegram_message_chatid if hasattr(
-                signal, 'telegram_message_chatid') else signal.get("telegram_message_chatid")
-
-            # Build message link
-            if message_id and chat_id:
-                # For private channels, use the chat_id; for public channels, use the username
-                message_link = f"https://t.me/c/{abs(int(chat_id))}/{message_id}"
-            else:
-                message_link = "No link available"
+            position = await run_mt(get_position_for_signal, self.meta_trader, signal_id)
+
+            entry_price = get_field(signal, "open_price", "N/A")
+            second_price = get_field(signal, "second_price")
+            stop_loss = get_field(signal, "stop_loss", "N/A")
+            tp_list = get_field(signal, "tp_list", "N/A")
+            signal_type = get_field(signal, "signal_type", "N/A")
+            channel = get_field(signal, "telegram_channel_title", "Unknown")
+            message_link = get_field(signal, "message_link") or "No link available"
 
             # Get the last 2 positions for this signal, sorted by ID descending
             position_repo = db_manager.get_position_repository()
-            db_positions = position_repo.get_positions_by_signal_id(signal_id)
+            db_positions = await run_mt(position_repo.get_positions_by_signal_id, signal_id)
 
             # Sort by position_id descending and take last 2
             db_positions_sorted = sorted(db_positions, key=lambda x: (
-                x.position_id if hasattr(x, 'position_id') else x.get("position_id")), reverse=True)
+                get_field(x, "position_id")), reverse=True)
 
             open_price_tickets = []
             second_price_tickets = []
             has_positions = False
             has_orders = False
 
+            # One MT5 snapshot of open tickets instead of several lookups per ticket
+            positions, orders = await self._positions_and_orders()
+            open_position_tickets = {p.ticket for p in positions}
+            pending_order_tickets = {o.ticket for o in orders}
+
             # First position (most recent) = open price, second position = second price
             for idx, db_pos in enumerate(db_positions_sorted[:2]):
-                ticket = db_pos.position_id if hasattr(
-                    db_pos, 'position_id') else db_pos.get("position_id")
-
-                # Check if exists in MT5
-                mt5_obj = self.meta_trader.get_position_by_ticket(ticket)
-                if not mt5_obj:
-                    mt5_obj = self.meta_trader.get_order_by_ticket(ticket)
-
-                if not mt5_obj:
-                    logger.warning(f"Ticket {ticket}: Not found in MT5")
-                    continue
+                ticket = get_field(db_pos, "position_id")
 
-                # Determine if position or order
-                if self.meta_trader.get_position_by_ticket(ticket):
+                # Check if exists in MT5 and whether it is a position or an order
+                if ticket in open_position_tickets:
                     has_positions = True
-                else:
+                elif ticket in pending_order_tickets:
                     has_orders = True
+                else:
+                    logger.warning("Ticket {}: Not found in MT5", ticket)
+                    continue
 
                 # First = open price, Second = second price
                 if idx == 0:
@@ -446,30 +470,8 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 open_price_tickets + second_price_tickets) else "None"
 
             # Determine emoji based on type and if position still exists in MT5
-            if open_price_tickets:
-                # Check if open price position still exists
-                open_ticket = int(open_price_tickets[0])
-                mt5_open = self.meta_trader.get_position_by_ticket(open_ticket)
-                if not mt5_open:
-                    mt5_open = self.meta_trader.get_order_by_ticket(
-                        open_ticket)
-                open_price_emoji = ("📈" if self.meta_trader.get_position_by_ticket(
-                    open_ticket) else "⏳") if mt5_open else "❌"
-            else:
-                open_price_emoji = "❌"
-
-            if second_price_tickets:
-                # Check if second price position still exists
-                second_ticket = int(second_price_tickets[0])
-                mt5_second = self.meta_trader.get_position_by_ticket(
-                    second_ticket)
-                if not mt5_second:
-                    mt5_second = self.meta_trader.get_order_by_ticket(
-                        second_ticket)
-                second_price_emoji = ("📈" if self.meta_trader.get_position_by_ticket(
-                    second_ticket) else "⏳") if mt5_second else "❌"
-            else:
-                second_price_emoji = "❌"
+            open_price_emoji = _entry_emoji(open_price_tickets, open_position_tickets, pending_order_tickets)
+            second_price_emoji = _entry_emoji(second_price_tickets, open_position_tickets, pending_order_tickets)
 
             # Add signal type emoji
             type_emoji = "🟢" if signal_type == "BUY" else "🔴"
@@ -512,7 +514,8 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 ])
             buttons.append([InlineKeyboardButton(
                 "⬅️ Back", callback_data="signals")])
-            await query.edit_message_text(
+            await self._edit(
+                query,
                 text,
                 parse_mode="Markdown",
                 reply_markup=InlineKeyboardMarkup(buttons)
@@ -523,47 +526,46 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
             if "Message is not modified" in str(e):
                 await query.answer("📍 Already viewing this signal", show_alert=False)
             else:
-                logger.error(
-                    f"Error showing signal detail for signal_id={signal_id}: {e}", exc_info=True)
+                logger.opt(exception=True).error(
+                    "Error showing signal detail for signal_id={}: {}", signal_id, e)
                 try:
-                    await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="signals")]]))
+                    await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("signals"))
                 except:
                     await query.answer(f"❌ Error: {str(e)}", show_alert=True)
 
     async def show_manage_signal_entries(self, query, user_id: int, signal_id: int, entry_type: str) -> None:
         """Show positions/orders for a specific entry price (open or second)"""
         try:
-            self.user_states[user_id] = {"state": "manage_entries", "context": {
-                "signal_id": signal_id, "entry_type": entry_type}}
+            self.user_states[user_id] = UserState("manage_entries", {
+                "signal_id": signal_id, "entry_type": entry_type})
 
             # Get signal and its linked positions
             signal_repo = db_manager.get_signal_repository()
-            signal = signal_repo.get_signal_by_id(signal_id)
+            signal = await run_mt(signal_repo.get_signal_by_id, signal_id)
             if not signal:
-                await query.edit_message_text("❌ Signal not found", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="signals")]]))
+                await self._edit(query, "❌ Signal not found", reply_markup=back_button("signals"))
                 return
 
             position_repo = db_manager.get_position_repository()
-            db_positions = position_repo.get_positions_by_signal_id(signal_id)
+            db_positions = await run_mt(position_repo.get_positions_by_signal_id, signal_id)
 
             if not db_positions:
-                await query.edit_message_text(f"❌ No positions found for this signal", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}")]]))
+                await self._edit(query, f"❌ No positions found for this signal", reply_markup=back_button(f"signal_{signal_id}"))
                 return
 
             # Sort by position_id descending and take last 2
             db_positions_sorted = sorted(db_positions, key=lambda x: (
-                x.position_id if hasattr(x, 'position_id') else x.get("position_id")), reverse=True)
+                get_field(x, "position_id")), reverse=True)
 
             # Get ticket based on entry_type: first (open) or second
             ticket = None
             if entry_type == "open" and len(db_positions_sorted) > 0:
-                ticket = db_positions_sorted[0].position_id if hasattr(
-                    db_positions_sorted[0], 'position_id') else db_positions_sorted[0].get("position_id")
+                ticket = get_field(db_positions_sorted[0], "position_id")
             elif entry_type == "second" and len(db_positions_sorted) > 1:
-                ticket = db_positions_sorted[1].position_id if hasattr(
-                    db_positions_sorted[1], 'position_id') else db_positions_sorted[1].get("position_id")
+                ticket = get_field(db_positions_sorted[1], "position_id")
             else:
-                await query.edit_message_text(
+                await self._edit(
+                    query,
                     f"❌ No {entry_type} price position found",
                     reply_markup=InlineKeyboardMarkup(
                         [[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}")]])
@@ -571,12 +573,13 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 return
 
             # Try to get it from MT5 (could be position or order)
-            position = self.meta_trader.get_position_by_ticket(ticket)
+            position = await run_mt(self.meta_trader.get_position_by_ticket, ticket)
             if not position:
-                position = self.meta_trader.get_order_by_ticket(ticket)
+                position = await run_mt(self.meta_trader.get_order_by_ticket, ticket)
 
             if not position:
-                await query.edit_message_text(
+                await self._edit(
+                    query,
                     f"❌ Position/Order #{ticket} not found in MT5 (may have been closed)",
                     reply_markup=InlineKeyboardMarkup(
                         [[InlineKeyboardButton("⬅️ Back", callback_data=f"signal_{signal_id}")]])
@@ -605,53 +608,24 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
             lots = position.volume if hasattr(position, 'volume') else (
                 position.volume_current if hasattr(position, 'volume_current') else 1)
             pnl = position.profit if hasattr(position, 'profit') else 0
-            pnl_emoji = "📈" if pnl >= 0 else "📉"
-
-            text = f"""📍 **Position**
-
-**Ticket:** #{ticket}
-**Symbol:** {symbol}
-**Open:** {open_price} | **Current:** {current_price}
-**SL:** {stop_loss} | **TP:** {take_profit}
-**Lots:** {lots}
-
-{pnl_emoji} **P&L:** ${pnl:.2f}"""
-
-            buttons = [
-                [
-                    InlineKeyboardButton(
-                        "🔴 Close Full", callback_data=f"close_{ticket}_full"),
-                    InlineKeyboardButton(
-                        "🟡 Close Half", callback_data=f"close_{ticket}_half"),
-                ],
-                [
-                    InlineKeyboardButton(
-                        "📉 Close Custom", callback_data=f"close_{ticket}_lot"),
-                    InlineKeyboardButton(
-                        "🟢 Risk Free", callback_data=f"close_{ticket}_risk_free"),
-                ],
-                [
-                    InlineKeyboardButton(
-                        "⬆️ Update SL", callback_data=f"update_{ticket}_sl"),
-                    InlineKeyboardButton(
-                        "⬆️ Update TP", callback_data=f"update_{ticket}_tp"),
-                ],
-            ]
 
+            text, buttons = self._render_position_card(
+                ticket, symbol, open_price, current_price, stop_loss, take_profit, lots, pnl)
             buttons.append([InlineKeyboardButton(
                 "⬅️ Back", callback_data=f"signal_{signal_id}")])
 
-            await query.edit_message_text(
+            await self._edit(
+                query,
                 text,
                 parse_mode="Markdown",
                 reply_markup=InlineKeyboardMarkup(buttons)
             )
 
         except Exception as e:
-            logger.error(
-                f"Error showing manage signal entries: {e}", exc_info=True)
+            logger.opt(exception=True).error(
+                "Error showing manage signal entries: {}", e)
             try:
-                await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="signals")]]))
+                await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("signals"))
             except:
                 await query.answer(f"❌ Error: {str(e)}", show_alert=True)
 
@@ -659,48 +633,31 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
         """Show all MT5 positions and pending orders as inline buttons"""
         try:
             STATE_POSITION_LIST = "position_list"
-            self.user_states[user_id] = {
-                "state": STATE_POSITION_LIST, "context": {}}
+            self.user_states[user_id] = UserState(STATE_POSITION_LIST)
 
             if not self.meta_trader:
-                await query.edit_message_text("❌ MetaTrader connection not available")
+                await self._edit(query, "❌ MetaTrader connection not available")
                 return
 
-            positions = self.meta_trader.get_open_positions() or []
-            orders = self.meta_trader.get_pending_orders() or []
+            positions, orders = await self._positions_and_orders()
 
             if not positions and not orders:
-                await query.edit_message_text(
+                await self._edit(
+                    query,
                     "📭 No open positions or pending orders",
-                    reply_markup=InlineKeyboardMarkup(
-                        [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]])
+                    reply_markup=back_button("menu")
                 )
                 return
 
-            buttons = []
-
-            for pos in positions:
-                symbol = pos.symbol if hasattr(
-                    pos, 'symbol') else pos.get("symbol", "UNKNOWN")
-                ticket = pos.ticket if hasattr(
-                    pos, 'ticket') else pos.get("ticket")
-                button_text = f"📈 {ticket}"
-                buttons.append([InlineKeyboardButton(
-                    button_text, callback_data=f"position_{ticket}")])
-
-            for order in orders:
-                symbol = order.symbol if hasattr(
-                    order, 'symbol') else order.get("symbol", "UNKNOWN")
-                ticket = order.ticket if hasattr(
-                    order, 'ticket') else order.get("ticket")
-                button_text = f"⏳ {ticket}"
-                buttons.append([InlineKeyboardButton(
-                    button_text, callback_data=f"position_{ticket}")])
+            buttons = [[InlineKeyboardButton(f"📈 {ticket}", callback_data=f"position_{ticket}")]
+                       for ticket in _tickets(positions)]
+            buttons += [[InlineKeyboardButton(f"⏳ {ticket}", callback_data=f"position_{ticket}")]
+                        for ticket in _tickets(orders)]
 
             text = f"📈 **Positions & Orders** 🔄 (Auto-updating)\n\n**Open:** {len(positions)} | **Pending:** {len(orders)}\n\nSelect for actions:"
             buttons.append([InlineKeyboardButton(
                 "⬅️ Back", callback_data="menu")])
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
 
             # Store message info for auto-update
             self.active_updates[user_id] = {
@@ -716,8 +673,8 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 self._auto_update_position_list(user_id, query.get_bot()))
 
         except Exception as e:
-            logger.error(f"Error showing position list: {e}")
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]))
+            logger.error("Error showing position list: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("menu"))
 
     async def _auto_update_position_list(self, user_id: int, bot) -> None:
         """Automatically update position list for user every 5 seconds"""
@@ -734,33 +691,17 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 if not self.meta_trader:
                     continue
 
-                positions = self.meta_trader.get_open_positions() or []
-                orders = self.meta_trader.get_pending_orders() or []
+                positions, orders = await self._positions_and_orders()
 
                 if not positions and not orders:
                     text = "📭 No open positions or pending orders"
                     buttons = [[InlineKeyboardButton(
                         "⬅️ Back", callback_data="menu")]]
                 else:
-                    buttons = []
-
-                    for pos in positions:
-                        symbol = pos.symbol if hasattr(
-                            pos, 'symbol') else pos.get("symbol", "UNKNOWN")
-                        ticket = pos.ticket if hasattr(
-                            pos, 'ticket') else pos.get("ticket")
-                        button_text = f"📈 {ticket}"
-                        buttons.append([InlineKeyboardButton(
-                            button_text, callback_data=f"position_{ticket}")])
-
-                    for order in orders:
-                        symbol = order.symbol if hasattr(
-                            order, 'symbol') else order.get("symbol", "UNKNOWN")
-                        ticket = order.ticket if hasattr(
-                            order, 'ticket') else order.get("ticket")
-                        button_text = f"⏳ {ticket}"
-                        buttons.append([InlineKeyboardButton(
-                            button_text, callback_data=f"position_{ticket}")])
+                    buttons = [[InlineKeyboardButton(f"📈 {ticket}", callback_data=f"position_{ticket}")]
+                               for ticket in _tickets(positions)]
+                    buttons += [[InlineKeyboardButton(f"⏳ {ticket}", callback_data=f"position_{ticket}")]
+                                for ticket in _tickets(orders)]
 
                     text = f"📈 **Positions & Orders** 🔄 (Auto-updating)\n\n**Open:** {len(positions)} | **Pending:** {len(orders)}\n\nSelect for actions:"
                     buttons.append([InlineKeyboardButton(
@@ -785,38 +726,107 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                         update_info["last_buttons"] = buttons
                     except Exception as e:
                         logger.debug(
-                            f"Could not update position list for user {user_id}: {e}")
+                            "Could not update position list for user {}: {}", user_id, e)
                         # Stop updating if message no longer exists
                         if user_id in self.active_updates:
                             del self.active_updates[user_id]
                         break
 
         except Exception as e:
-            logger.error(f"Error in auto-update position list: {e}")
+            logger.error("Error in auto-update position list: {}", e)
             if user_id in self.active_updates:
                 del self.active_updates[user_id]
 
+    @staticmethod
+    def _render_position_card(ticket, symbol, open_price, current_price, stop_loss, take_profit,
+                              lots, pnl, signal_info: str = ""):
+        """Open-position card text and its action button rows (callers append their own Back row)"""
+        text = _POSITION_CARD.format_map({
+            "ticket": ticket, "symbol": symbol, "open_price": open_price, "current_price": current_price,
+            "stop_loss": stop_loss, "take_profit": take_profit, "lots": lots, "pnl": pnl,
+            "pnl_emoji": "📈" if pnl >= 0 else "📉", "signal_info": signal_info,
+        })
+        buttons = [
+            [
+                InlineKeyboardButton("🔴 Close Full", callback_data=f"close_{ticket}_full"),
+                InlineKeyboardButton("🟡 Close Half", callback_data=f"close_{ticket}_half"),
+            ],
+            [
+                InlineKeyboardButton("📉 Close Custom", callback_data=f"close_{ticket}_lot"),
+                InlineKeyboardButton("🟢 Risk Free", callback_data=f"close_{ticket}_risk_free"),
+            ],
+            [
+                InlineKeyboardButton("⬆️ Update SL", callback_data=f"update_{ticket}_sl"),
+                InlineKeyboardButton("⬆️ Update TP", callback_data=f"update_{ticket}_tp"),
+            ],
+        ]
+        return text, buttons
+
+    async def _signal_info_for_ticket(self, ticket: int) -> str:
+        """Markdown "Signal Info" block for the signal linked to a ticket, or "" if none"""
+        position_repo = db_manager.get_position_repository()
+        signal_repo = db_manager.get_signal_repository()
+
+        db_position = await run_mt(position_repo.get_position_by_ticket, ticket)
+        if not db_position:
+            return ""
+        signal_id = get_field(db_position, "signal_id")
+        signal = await run_mt(signal_repo.get_signal_by_id, signal_id)
+        if not signal:
+            return ""
+
+        provider = get_field(signal, "provider", 'Unknown')
+        channel = get_field(signal, "telegram_channel_title", 'Unknown')
+        message_id = get_field(signal, "telegram_message_id")
+        chat_id = get_field(signal, "telegram_message_chatid")
+
+        # Escape markdown special characters
+        provider_escaped = str(provider).replace('_', '\\_').replace('*', '\\*').replace(
+            '[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('`', '\\`')
+        channel_escaped = str(channel).replace('_', '\\_').replace('*', '\\*').replace(
+            '[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('`', '\\`')
+
+        signal_info = f"\n\n📊 Signal Info:\n"
+        signal_info += f"Signal ID: #{signal_id}\n"
+        signal_info += f"Provider: {provider_escaped}\n"
+        signal_info += f"Channel: {channel_escaped}\n"
+
+        if message_id and chat_id:
+            # Convert chat_id for Telegram link format
+            chat_id_int = int(chat_id)
+            if chat_id_int < 0:
+                chat_id_str = str(chat_id_int)
+                if chat_id_str.startswith('-100'):
+                    # Remove -100 prefix
+                    chat_id_for_link = chat_id_str[4:]
+                else:
+                    chat_id_for_link = str(abs(chat_id_int))
+            else:
+                chat_id_for_link = str(chat_id_int)
+            message_link = f"https://t.me/c/{chat_id_for_link}/{message_id}"
+            signal_info += f"[View Signal]({message_link})"
+        return signal_info
+
     async def show_position_detail(self, query, user_id: int, ticket: int) -> None:
         """Show position/order details with action buttons"""
         try:
             STATE_VIEWING_POSITION = "viewing_position"
-            self.user_states[user_id] = {
-                "state": STATE_VIEWING_POSITION, "context": {"ticket": ticket}}
+            self.user_states[user_id] = UserState(STATE_VIEWING_POSITION, {"ticket": ticket})
 
             # Stop auto-update for this user
             self._stop_auto_update(user_id)
 
             if not self.meta_trader:
-                await query.edit_message_text("❌ MetaTrader not available")
+                await self._edit(query, "❌ MetaTrader not available")
                 return
 
-            position = self.meta_trader.get_position_by_ticket(ticket)
+            position = await run_mt(self.meta_trader.get_position_by_ticket, ticket)
             order = None
             if not position:
-                order = self.meta_trader.get_order_by_ticket(ticket)
+                order = await run_mt(self.meta_trader.get_order_by_ticket, ticket)
 
             if not position and not order:
-                await query.edit_message_text("❌ Position not found", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]]))
+                await self._edit(query, "❌ Position not found", reply_markup=back_button("positions"))
                 return
 
             if position:
@@ -832,86 +842,11 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                     position, 'take_profit') else "N/A"
                 lots = position.volume if hasattr(position, 'volume') else 1
                 pnl = position.profit if hasattr(position, 'profit') else 0
-                pnl_emoji = "📈" if pnl >= 0 else "📉"
-
-                # Get signal information from database
-                position_repo = db_manager.get_position_repository()
-                signal_repo = db_manager.get_signal_repository()
-
-                db_position = position_repo.get_position_by_ticket(ticket)
-                signal_info = ""
-
-                if db_position:
-                    signal_id = db_position.signal_id if hasattr(
-                        db_position, 'signal_id') else db_position.get('signal_id')
-                    signal = signal_repo.get_signal_by_id(signal_id)
-
-                    if signal:
-                        provider = signal.provider if hasattr(
-                            signal, 'provider') else signal.get('provider', 'Unknown')
-                        channel = signal.telegram_channel_title if hasattr(
-                            signal, 'telegram_channel_title') else signal.get('telegram_channel_title', 'Unknown')
-                        message_id = signal.telegram_message_id if hasattr(
-                            signal, 'telegram_message_id') else signal.get('telegram_message_id')
-                        chat_id = signal.telegram_message_chatid if hasattr(
-                            signal, 'telegram_message_chatid') else signal.get('telegram_message_chatid')
-
-                        # Escape markdown special characters
-                        provider_escaped = str(provider).replace('_', '\\_').replace('*', '\\*').replace(
-                            '[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('`', '\\`')
-                        channel_escaped = str(channel).replace('_', '\\_').replace('*', '\\*').replace(
-                            '[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('`', '\\`')
-
-                        signal_info = f"\n\n📊 Signal Info:\n"
-                        signal_info += f"Signal ID: #{signal_id}\n"
-                        signal_info += f"Provider: {provider_escaped}\n"
-                        signal_info += f"Channel: {channel_escaped}\n"
-
-                        if message_id and chat_id:
-                            # Convert chat_id for Telegram link format
-                            chat_id_int = int(chat_id)
-                            if chat_id_int < 0:
-                                chat_id_str = str(chat_id_int)
-                                if chat_id_str.startswith('-100'):
-                                    # Remove -100 prefix
-                                    chat_id_for_link = chat_id_str[4:]
-                                else:
-                                    chat_id_for_link = str(abs(chat_id_int))
-                            else:
-                                chat_id_for_link = str(chat_id_int)
-                            message_link = f"https://t.me/c/{chat_id_for_link}/{message_id}"
-                            signal_info += f"[View Signal]({message_link})"
-
-                text = f"""📍 **Position**
-
-**Ticket:** #{ticket}
-**Symbol:** {symbol}
-**Open:** {open_price} | **Current:** {current_price}
-**SL:** {stop_loss} | **TP:** {take_profit}
-**Lots:** {lots}
 
-{pnl_emoji} **P&L:** ${pnl:.2f}{signal_info}"""
+                signal_info = await self._signal_info_for_ticket(ticket)
 
-                buttons = [
-                    [
-                        InlineKeyboardButton(
-                            "🔴 Close Full", callback_data=f"close_{ticket}_full"),
-                        InlineKeyboardButton(
-                            "🟡 Close Half", callback_data=f"close_{ticket}_half"),
-                    ],
-                    [
-                        InlineKeyboardButton(
-                            "📉 Close Custom", callback_data=f"close_{ticket}_lot"),
-                        InlineKeyboardButton(
-                            "🟢 Risk Free", callback_data=f"close_{ticket}_risk_free"),
-                    ],
-                    [
-                        InlineKeyboardButton(
-                            "⬆️ Update SL", callback_data=f"update_{ticket}_sl"),
-                        InlineKeyboardButton(
-                            "⬆️ Update TP", callback_data=f"update_{ticket}_tp"),
-                    ],
-                ]
+                text, buttons = self._render_position_card(
+                    ticket, symbol, open_price, current_price, stop_loss, take_profit, lots, pnl, signal_info)
             else:
                 symbol = order.symbol if hasattr(order, 'symbol') else "N/A"
                 order_type = order.type if hasattr(order, 'type') else "N/A"
@@ -924,53 +859,7 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
                 lots = order.volume_current if hasattr(
                     order, 'volume_current') else 1
 
-                # Get signal information from database
-                position_repo = db_manager.get_position_repository()
-                signal_repo = db_manager.get_signal_repository()
-
-                db_position = position_repo.get_position_by_ticket(ticket)
-                signal_info = ""
-
-                if db_position:
-                    signal_id = db_position.signal_id if hasattr(
-                        db_position, 'signal_id') else db_position.get('signal_id')
-                    signal = signal_repo.get_signal_by_id(signal_id)
-
-                    if signal:
-                        provider = signal.provider if hasattr(
-                            signal, 'provider') else signal.get('provider', 'Unknown')
-                        channel = signal.telegram_channel_title if hasattr(
-                            signal, 'telegram_channel_title') else signal.get('telegram_channel_title', 'Unknown')
-                        message_id = signal.telegram_message_id if hasattr(
-                            signal, 'telegram_message_id') else signal.get('telegram_message_id')
-                        chat_id = signal.telegram_message_chatid if hasattr(
-                            signal, 'telegram_message_chatid') else signal.get('telegram_message_chatid')
-
-                        # Escape markdown special characters
-                        provider_escaped = str(provider).replace('_', '\\_').replace('*', '\\*').replace(
-                            '[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('`', '\\`')
-                        channel_escaped = str(channel).replace('_', '\\_').replace('*', '\\*').replace(
-                            '[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('`', '\\`')
-
-                        signal_info = f"\n\n📊 Signal Info:\n"
-                        signal_info += f"Signal ID: #{signal_id}\n"
-                        signal_info += f"Provider: {provider_escaped}\n"
-                        signal_info += f"Channel: {channel_escaped}\n"
-
-                        if message_id and chat_id:
-                            # Convert chat_id for Telegram link format
-                            chat_id_int = int(chat_id)
-                            if chat_id_int < 0:
-                                chat_id_str = str(chat_id_int)
-                                if chat_id_str.startswith('-100'):
-                                    # Remove -100 prefix
-                                    chat_id_for_link = chat_id_str[4:]
-                                else:
-                                    chat_id_for_link = str(abs(chat_id_int))
-                            else:
-                                chat_id_for_link = str(chat_id_int)
-                            message_link = f"https://t.me/c/{chat_id_for_link}/{message_id}"
-                            signal_info += f"[View Signal]({message_link})"
+                signal_info = await self._signal_info_for_ticket(ticket)
 
                 text = f"""⏳ **Pending Order**
 
@@ -988,57 +877,39 @@ EURUSD BUY 1.0850 1.0855 1.0870,1.0885,1.0900 1.0830 Manual trade entry
 
             buttons.append([InlineKeyboardButton(
                 "⬅️ Back", callback_data="positions")])
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
 
         except Exception as e:
-            logger.error(f"Error showing position detail: {e}")
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="positions")]]))
+            logger.error("Error showing position detail: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("positions"))
 
     async def show_tester(self, query, user_id: int) -> None:
         """Show signal tester interface"""
         try:
             STATE_TESTER = "tester"
-            self.user_states[user_id] = {"state": STATE_TESTER, "context": {}}
+            self.user_states[user_id] = UserState(STATE_TESTER)
 
-            text = """🧪 **Signal Tester**
-
-Send a signal text to parse:
-
-**Example:**
-`EUR/USD BUY 1.2500 SL: 1.2450 TP: 1.2550, 1.2600`
-
-Will export:
-• Open Price
-• Second Price
-• Stop Loss
-• Take Profit List"""
-
-            buttons = [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            await self._edit(query, _TESTER_TEXT, parse_mode="Markdown", reply_markup=back_button("menu"))
 
         except Exception as e:
-            logger.error(f"Error showing tester: {e}")
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]))
+            logger.error("Error showing tester: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("menu"))
 
     async def show_account_details(self, update: Update, user_id: int) -> None:
         """Show full account details with main menu buttons on startup"""
         try:
             STATE_MAIN_MENU = "main_menu"
-            self.user_states[user_id] = {
-                "state": STATE_MAIN_MENU, "context": {}}
+            self.user_states[user_id] = UserState(STATE_MAIN_MENU)
 
             if not self.meta_trader:
                 await update.message.reply_text("❌ MetaTrader not available")
                 return
 
-            account_info = mt5.account_info()
+            account_info, positions, orders = await self._account_snapshot()
             if not account_info:
                 await update.message.reply_text("❌ Unable to fetch account info")
                 return
 
-            positions = self.meta_trader.get_open_positions() or []
-            orders = self.meta_trader.get_pending_orders() or []
-
             # Calculate account metrics
             balance = account_info.balance
             equity = account_info.equity
@@ -1109,7 +980,7 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_
             asyncio.create_task(self._auto_update_account_details(user_id))
 
         except Exception as e:
-            logger.error(f"Error showing account details: {e}")
+            logger.error("Error showing account details: {}", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
 
     async def _auto_update_account_details(self, user_id: int) -> None:
@@ -1128,13 +999,10 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_
                 if not bot or not self.meta_trader:
                     continue
 
-                account_info = mt5.account_info()
+                account_info, positions, orders = await self._account_snapshot()
                 if not account_info:
                     continue
 
-                positions = self.meta_trader.get_open_positions() or []
-                orders = self.meta_trader.get_pending_orders() or []
-
                 # Calculate account metrics
                 balance = account_info.balance
                 equity = account_info.equity
@@ -1204,14 +1072,14 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_
                         update_info["last_buttons"] = buttons
                     except Exception as e:
                         logger.debug(
-                            f"Could not update account details for user {user_id}: {e}")
+                            "Could not update account details for user {}: {}", user_id, e)
                         # Stop updating if message no longer exists
                         if user_id in self.active_updates:
                             del self.active_updates[user_id]
                         break
 
         except Exception as e:
-            logger.error(f"Error in auto-update account details: {e}")
+            logger.error("Error in auto-update account details: {}", e)
             if user_id in self.active_updates:
                 del self.active_updates[user_id]
 
@@ -1219,24 +1087,20 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_
         """Show account details from callback (used for menu navigation)"""
         try:
             STATE_MAIN_MENU = "main_menu"
-            self.user_states[user_id] = {
-                "state": STATE_MAIN_MENU, "context": {}}
+            self.user_states[user_id] = UserState(STATE_MAIN_MENU)
 
             # Stop auto-update for this user
             self._stop_auto_update(user_id)
 
             if not self.meta_trader:
-                await query.edit_message_text("❌ MetaTrader not available")
+                await self._edit(query, "❌ MetaTrader not available")
                 return
 
-            account_info = mt5.account_info()
+            account_info, positions, orders = await self._account_snapshot()
             if not account_info:
-                await query.edit_message_text("❌ Unable to fetch account info")
+                await self._edit(query, "❌ Unable to fetch account info")
                 return
 
-            positions = self.meta_trader.get_open_positions() or []
-            orders = self.meta_trader.get_pending_orders() or []
-
             # Calculate account metrics
             balance = account_info.balance
             equity = account_info.equity
@@ -1287,42 +1151,27 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_
                 ],
             ]
 
-            await query.edit_message_text(
+            await self._edit(
+                query,
                 text,
                 parse_mode="Markdown",
                 reply_markup=InlineKeyboardMarkup(buttons)
             )
 
         except Exception as e:
-            logger.error(f"Error showing account details from callback: {e}")
-            await query.edit_message_text(f"❌ Error: {str(e)}")
-
-    async def show_trade_summary(self, query, user_id: int) -> None:
-        """Show trade summary with account stats"""
-        try:
-            STATE_MAIN_MENU = "main_menu"
-            self.user_states[user_id] = {
-                "state": STATE_MAIN_MENU, "context": {}}
+            logger.error("Error showing account details from callback: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}")
 
-            if not self.meta_trader:
-                await query.edit_message_text("❌ MetaTrader not available")
-                return
-
-            account_info = mt5.account_info()
-            if not account_info:
-                await query.edit_message_text("❌ Unable to fetch account info")
-                return
-
-            positions = self.meta_trader.get_open_positions() or []
-            orders = self.meta_trader.get_pending_orders() or []
-
-            balance = account_info.balance
-            equity = account_info.equity
-            profit = equity - balance
-            profit_percent = (profit / balance * 100) if balance else 0
-            profit_emoji = "📈" if profit >= 0 else "📉"
+    @staticmethod
+    def _render_trade_summary(account_info, positions, orders) -> str:
+        """Trade summary message text for one account snapshot"""
+        balance = account_info.balance
+        equity = account_info.equity
+        profit = equity - balance
+        profit_percent = (profit / balance * 100) if balance else 0
+        profit_emoji = "📈" if profit >= 0 else "📉"
 
-            text = f"""💼 **Trade Summary**
+        return f"""💼 **Trade Summary**
 
 **Balance:** ${balance:,.2f}
 **Equity:** ${equity:,.2f}
@@ -1336,13 +1185,34 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_
 
 _Updated: {datetime.now().strftime('%H:%M:%S')}_"""
 
-            buttons = [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+    async def show_trade_summary(self, query, user_id: int) -> None:
+        """Show trade summary with account stats"""
+        try:
+            STATE_MAIN_MENU = "main_menu"
+            self.user_states[user_id] = UserState(STATE_MAIN_MENU)
+
+            if not self.meta_trader:
+                await self._edit(query, "❌ MetaTrader not available")
+                return
+
+            # Rapid refresh presses within SUMMARY_CACHE_TTL reuse the last render, so
+            # they skip the MT5 round-trips and _edit() skips the identical edit
+            cached = self._summary_cache
+            if cached is not None and time.monotonic() - cached[0] < self.SUMMARY_CACHE_TTL:
+                text = cached[1]
+            else:
+                account_info, positions, orders = await self._account_snapshot()
+                if not account_info:
+                    await self._edit(query, "❌ Unable to fetch account info")
+                    return
+                text = self._render_trade_summary(account_info, positions, orders)
+                self._summary_cache = (time.monotonic(), text)
+
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=back_button("menu"))
 
         except Exception as e:
-            logger.error(f"Error showing trade summary: {e}")
-            buttons = [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup(buttons))
+            logger.error("Error showing trade summary: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("menu"))
 
     async def show_history_menu(self, query, user_id: int) -> None:
         """Show history time range selection menu"""
@@ -1351,7 +1221,7 @@ _Updated: {datetime.now().strftime('%H:%M:%S')}_"""
             self._stop_auto_update(user_id)
 
             STATE_HISTORY = "history_menu"
-            self.user_states[user_id] = {"state": STATE_HISTORY, "context": {}}
+            self.user_states[user_id] = UserState(STATE_HISTORY)
 
             text = """📜 **Trading History**
 
@@ -1364,58 +1234,40 @@ Select a time range to view your trading history:
 
 History includes both closed and active positions with comprehensive metrics."""
 
-            buttons = [
-                [
-                    InlineKeyboardButton(
-                        "📅 Today", callback_data="history_today"),
-                    InlineKeyboardButton(
-                        "📆 Yesterday", callback_data="history_yesterday"),
-                ],
-                [
-                    InlineKeyboardButton(
-                        "🗓️ Calendar", callback_data="history_calendar"),
-                ],
-                [InlineKeyboardButton("⬅️ Back", callback_data="menu")]
-            ]
-
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=self._history_menu_markup)
 
         except Exception as e:
-            logger.error(f"Error showing history menu: {e}")
-            buttons = [[InlineKeyboardButton("⬅️ Back", callback_data="menu")]]
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup(buttons))
+            logger.error("Error showing history menu: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("menu"))
 
-    async def show_history_calendar(self, query, user_id: int, year: int = None, month: int = None, mode: str = "from") -> None:
-        """Show calendar for date selection"""
+    async def show_history_calendar(self, query, user_id: int, year: int = None, month: int = None, mode: str = "from", error_banner: Optional[str] = None) -> None:
+        """Show calendar for date selection, optionally with an error line; skips the edit if nothing changed"""
         try:
             # Stop any auto-updates
             self._stop_auto_update(user_id)
 
-            import calendar
-            from datetime import datetime
-
             now = datetime.now()
             year = year or now.year
             month = month or now.month
 
             # Store mode in user context (selecting 'from' or 'to' date)
-            if user_id not in self.user_states:
-                self.user_states[user_id] = {}
-            if "context" not in self.user_states[user_id]:
-                self.user_states[user_id]["context"] = {}
+            try:
+                user_state = self.user_states[user_id]
+            except KeyError:
+                user_state = self.user_states[user_id] = UserState()
 
-            self.user_states[user_id]["state"] = "history_calendar"
-            self.user_states[user_id]["context"]["calendar_mode"] = mode
-            self.user_states[user_id]["context"]["calendar_year"] = year
-            self.user_states[user_id]["context"]["calendar_month"] = month
+            user_state.state = "history_calendar"
+            user_state.context["calendar_mode"] = mode
+            user_state.context["calendar_year"] = year
+            user_state.context["calendar_month"] = month
 
             # Get month calendar
             cal = calendar.monthcalendar(year, month)
             month_name = calendar.month_name[month]
 
             # Build calendar text
-            from_date = self.user_states[user_id]["context"].get("from_date")
-            to_date = self.user_states[user_id]["context"].get("to_date")
+            from_date = user_state.context.get("from_date")
+            to_date = user_state.context.get("to_date")
 
             text = f"""🗓️ **Calendar - Select {'Start' if mode == 'from' else 'End'} Date**
 
@@ -1426,6 +1278,8 @@ History includes both closed and active positions with comprehensive metrics."""
                 text += f"\n📍 From: {from_date.strftime('%Y-%m-%d')}"
             if to_date:
                 text += f"\n📍 To: {to_date.strftime('%Y-%m-%d')}"
+            if error_banner:
+                text += f"\n\n⚠️ {error_banner}"
 
             # Build calendar buttons
             buttons = []
@@ -1481,14 +1335,14 @@ History includes both closed and active positions with comprehensive metrics."""
 
             buttons.append([InlineKeyboardButton(
                 "⬅️ Back", callback_data="history")])
+            markup = InlineKeyboardMarkup(buttons)
 
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            # _edit skips the call when this exact calendar is already on screen
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=markup)
 
         except Exception as e:
-            logger.error(f"Error showing calendar: {e}")
-            buttons = [[InlineKeyboardButton(
-                "⬅️ Back", callback_data="history")]]
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup(buttons))
+            logger.error("Error showing calendar: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("history"))
 
     async def show_history_results(self, query, user_id: int, range_type: str, from_date: datetime = None, to_date: datetime = None) -> None:
         """Show history results for selected date range"""
@@ -1497,17 +1351,17 @@ History includes both closed and active positions with comprehensive metrics."""
             self._stop_auto_update(user_id)
 
             # Initialize user state if needed
-            if user_id not in self.user_states:
-                self.user_states[user_id] = {}
-            if "context" not in self.user_states[user_id]:
-                self.user_states[user_id]["context"] = {}
+            try:
+                user_state = self.user_states[user_id]
+            except KeyError:
+                user_state = self.user_states[user_id] = UserState()
 
             # Only reset page to 0 if this is a new search (different range type or dates)
-            current_range = self.user_states[user_id]["context"].get(
+            current_range = user_state.context.get(
                 "history_range_type")
-            current_from = self.user_states[user_id]["context"].get(
+            current_from = user_state.context.get(
                 "from_date")
-            current_to = self.user_states[user_id]["context"].get("to_date")
+            current_to = user_state.context.get("to_date")
 
             # Check if this is a new search vs pagination
             is_new_search = (
@@ -1517,8 +1371,8 @@ History includes both closed and active positions with comprehensive metrics."""
             )
 
             # Reset page only for new searches
-            if is_new_search or "history_page" not in self.user_states[user_id]["context"]:
-                self.user_states[user_id]["context"]["history_page"] = 0
+            if is_new_search or "history_page" not in user_state.context:
+                user_state.context["history_page"] = 0
 
             from .history_helpers import (
                 get_date_range_timestamps, get_historical_deals,
@@ -1526,20 +1380,20 @@ History includes both closed and active positions with comprehensive metrics."""
             )
 
             # Get date range
-            start, end = get_date_range_timestamps(
-                range_type, from_date, to_date)
+            start, end = await run_mt(
+                get_date_range_timestamps, range_type, from_date, to_date)
 
             # Show loading message
-            await query.edit_message_text("🔄 Loading trading history...")
+            await self._edit(query, "🔄 Loading trading history...")
 
             # Fetch historical deals
-            deals = get_historical_deals(start, end)
+            deals = await run_mt(get_historical_deals, start, end)
 
             # Match with signals
-            historical_positions = match_positions_with_signals(deals)
+            historical_positions = await run_mt(match_positions_with_signals, deals)
 
             # Get open positions if they're within the date range
-            open_positions = get_open_positions_with_metrics(self.meta_trader)
+            open_positions = await run_mt(get_open_positions_with_metrics, self.meta_trader)
 
             # Filter open positions by date range
             filtered_open = [
@@ -1549,7 +1403,7 @@ History includes both closed and active positions with comprehensive metrics."""
 
             # Combine results
             all_results = historical_positions + filtered_open
-            logger.debug(f"[HISTORY] User {user_id}: {len(all_results)} total positions")
+            logger.debug("[HISTORY] User {}: {} total positions", user_id, len(all_results))
 
             if not all_results:
                 text = f"""📜 **Trading History**
@@ -1558,9 +1412,7 @@ History includes both closed and active positions with comprehensive metrics."""
 
 No trades found for this period."""
 
-                buttons = [[InlineKeyboardButton(
-                    "⬅️ Back", callback_data="history")]]
-                await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+                await self._edit(query, text, parse_mode="Markdown", reply_markup=back_button("history"))
                 return
 
             # Calculate summary statistics
@@ -1605,13 +1457,13 @@ No trades found for this period."""
             buttons = []
 
             # Store results in user context for later
-            self.user_states[user_id]["context"]["history_results"] = all_results
-            self.user_states[user_id]["context"]["history_range_type"] = range_type
+            user_state.context["history_results"] = all_results
+            user_state.context["history_range_type"] = range_type
 
             # Get current page (default to 0)
-            current_page = self.user_states[user_id]["context"].get(
+            current_page = user_state.context.get(
                 "history_page", 0)
-            self.user_states[user_id]["context"]["history_page"] = current_page
+            user_state.context["history_page"] = current_page
 
             # Calculate pagination
             page_size = 20
@@ -1665,13 +1517,11 @@ No trades found for this period."""
             buttons.append([InlineKeyboardButton(
                 "⬅️ Back", callback_data="history")])
 
-            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
+            await self._edit(query, text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
 
         except Exception as e:
-            logger.error(f"Error showing history results: {e}")
-            buttons = [[InlineKeyboardButton(
-                "⬅️ Back", callback_data="history")]]
-            await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup(buttons))
+            logger.error("Error showing history results: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("history"))
 
     async def show_history_detail(self, query, user_id: int, result_index: int) -> None:
         """Show detailed metrics for a specific historical position"""
@@ -1680,7 +1530,7 @@ No trades found for this period."""
             self._stop_auto_update(user_id)
 
             # Get results from user context
-            results = self.user_states[user_id]["context"].get(
+            results = self.user_states[user_id].context.get(
                 "history_results", [])
 
             if result_index >= len(results):
@@ -1701,7 +1551,7 @@ No trades found for this period."""
                 if ticket_id:
                     try:
                         signal_repo = db_manager.get_signal_repository()
-                        signal_model = signal_repo.get_signal_by_position_id(ticket_id)
+                        signal_model = await run_mt(signal_repo.get_signal_by_position_id, ticket_id)
 
                         if signal_model:
                             # SignalModel object - access attributes directly
@@ -1718,7 +1568,7 @@ No trades found for this period."""
                                 'symbol': signal_model.symbol
                             }
                     except Exception as e:
-                        logger.error(f"Error fetching signal for ticket {ticket_id}: {e}")
+                        logger.error("Error fetching signal for ticket {}: {}", ticket_id, e)
 
             # Build detailed message using HTML (more robust than Markdown)
             position_type_emoji = "🟢" if metrics.get('position_type') == "BUY" else "🔴"
@@ -1759,7 +1609,7 @@ No trades found for this period."""
                         message_link = f"https://t.me/c/{chat_id_for_link}/{message_id}"
                         text += f'<a href="{message_link}">View Signal</a>\n'
                     except Exception as link_error:
-                        logger.warning(f"Error creating message link: {link_error}")
+                        logger.warning("Error creating message link: {}", link_error)
                         text += f"Message: Not available\n"
                 else:
                     text += f"Message: Not available\n"
@@ -1851,21 +1701,19 @@ No trades found for this period."""
                 "⬅️ Back", callback_data="history_back")])
 
             try:
-                await query.edit_message_text(text, parse_mode="HTML", reply_markup=InlineKeyboardMarkup(buttons))
+                await self._edit(query, text, parse_mode="HTML", reply_markup=InlineKeyboardMarkup(buttons))
             except Exception as send_error:
                 # Log the problematic text for debugging
-                logger.error(f"Failed to send message. Error: {send_error}")
-                logger.error(f"Message length: {len(text)} chars")
-                logger.error(f"First 500 chars: {text[:500]}")
-                logger.error(f"Chars around offset 394: {text[350:450]}")
+                logger.error("Failed to send message. Error: {}", send_error)
+                logger.error("Message length: {} chars", len(text))
+                logger.error("First 500 chars: {}", text[:500])
+                logger.error("Chars around offset 394: {}", text[350:450])
                 raise
 
         except Exception as e:
-            logger.error(f"Error showing history detail: {e}", exc_info=True)
-            buttons = [[InlineKeyboardButton(
-                "⬅️ Back", callback_data="history_back")]]
+            logger.opt(exception=True).error("Error showing history detail: {}", e)
             try:
-                await query.edit_message_text(f"❌ Error: {str(e)}", reply_markup=InlineKeyboardMarkup(buttons))
+                await self._edit(query, f"❌ Error: {str(e)}", reply_markup=back_button("history_back"))
             except:
                 await query.answer(f"❌ Error: {str(e)}", show_alert=True)
 
@@ -1880,29 +1728,16 @@ Analyze trading performance by signal provider channel.
 
 Select analysis period:"""
 
-            buttons = [
-                [
-                    InlineKeyboardButton("📅 All Time", callback_data="analyze_all"),
-                    InlineKeyboardButton("📆 This Week", callback_data="analyze_week"),
-                ],
-                [
-                    InlineKeyboardButton("📅 This Month", callback_data="analyze_month"),
-                    InlineKeyboardButton("📅 Last 30 Days", callback_data="analyze_30days"),
-                ],
-                [
-                    InlineKeyboardButton("⬅️ Back to Menu", callback_data="menu"),
-                ],
-            ]
-
-            await query.edit_message_text(
+            await self._edit(
+                query,
                 text,
                 parse_mode="HTML",
-                reply_markup=InlineKeyboardMarkup(buttons)
+                reply_markup=self._analyze_menu_markup
             )
 
         except Exception as e:
-            logger.error(f"Error showing analyze menu: {e}", exc_info=True)
-            await query.edit_message_text(f"❌ Error: {str(e)}")
+            logger.opt(exception=True).error("Error showing analyze menu: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}")
 
     async def show_channel_list(self, query, user_id: int, period: str = "all") -> None:
         """Show list of channels with summary statistics"""
@@ -1938,15 +1773,16 @@ Select analysis period:"""
 
             if not channels:
                 text = f"📊 <b>Channel Analysis - {period_label}</b>\n\n❌ No channels found with trading activity."
-                buttons = [[InlineKeyboardButton("⬅️ Back", callback_data="analyze")]]
-                await query.edit_message_text(text, parse_mode="HTML", reply_markup=InlineKeyboardMarkup(buttons))
+                await self._edit(query, text, parse_mode="HTML", reply_markup=back_button("analyze"))
                 return
 
             # Store period in user context for detail view
-            if user_id not in self.user_states:
-                self.user_states[user_id] = {"state": "analyze", "context": {}}
-            self.user_states[user_id]["context"]["analyze_period"] = period
-            self.user_states[user_id]["context"]["channels"] = channels
+            try:
+                user_state = self.user_states[user_id]
+            except KeyError:
+                user_state = self.user_states[user_id] = UserState("analyze")
+            user_state.context["analyze_period"] = period
+            user_state.context["channels"] = channels
 
             # Build message with channel list
             text = f"📊 <b>Channel Analysis - {period_label}</b>\n\n"
@@ -1987,15 +1823,16 @@ Select analysis period:"""
             # Navigation buttons
             buttons.append([InlineKeyboardButton("⬅️ Back", callback_data="analyze")])
 
-            await query.edit_message_text(
+            await self._edit(
+                query,
                 text,
                 parse_mode="HTML",
                 reply_markup=InlineKeyboardMarkup(buttons)
             )
 
         except Exception as e:
-            logger.error(f"Error showing channel list: {e}", exc_info=True)
-            await query.edit_message_text(f"❌ Error: {str(e)}")
+            logger.opt(exception=True).error("Error showing channel list: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}")
 
     async def show_channel_detail(self, query, user_id: int, channel_idx: int) -> None:
         """Show detailed analysis for a specific channel"""
@@ -2003,11 +1840,12 @@ Select analysis period:"""
             self._stop_auto_update(user_id)
 
             # Get channel from user context
-            if user_id not in self.user_states or "context" not in self.user_states[user_id]:
+            try:
+                context = self.user_states[user_id].context
+            except KeyError:
                 await query.answer("Session expired. Please start again.", show_alert=True)
                 return
 
-            context = self.user_states[user_id]["context"]
             channels = context.get("channels", [])
             period = context.get("analyze_period", "all")
 
@@ -2087,12 +1925,13 @@ Select analysis period:"""
                 [InlineKeyboardButton("🏠 Main Menu", callback_data="menu")],
             ]
 
-            await query.edit_message_text(
+            await self._edit(
+                query,
                 text,
                 parse_mode="HTML",
                 reply_markup=InlineKeyboardMarkup(buttons)
             )
 
         except Exception as e:
-            logger.error(f"Error showing channel detail: {e}", exc_info=True)
-            await query.edit_message_text(f"❌ Error: {str(e)}")
+            logger.opt(exception=True).error("Error showing channel detail: {}", e)
+            await self._edit(query, f"❌ Error: {str(e)}")
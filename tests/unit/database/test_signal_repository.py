@@ -1,9 +1,11 @@
 """Unit tests for SignalRepository"""
 
+import os
 import unittest
 from unittest.mock import patch, MagicMock
 from tests.fixtures import TestBase, sample_signal_record
 from app.Database.repository.signal_repository import SignalRepository
+from app.Database.repository.position_repository import PositionRepository
 
 
 class TestSignalRepository(TestBase):
@@ -135,5 +137,53 @@ class TestSignalRepository(TestBase):
         self.assertEqual(result["symbol"], "EURUSD")
 
 
+class TestSignalRepositorySharedCache(TestBase):
+    """Position -> signal lookups stay fresh across SignalRepository instances"""
+
+    def setUp(self):
+        super().setUp()
+        db_path = os.path.join(self.temp_dir, "signals.db")
+        self.writer = SignalRepository(db_path)
+        self.reader = SignalRepository(db_path)
+        positions = PositionRepository(db_path)
+        self.writer.create_table()
+        positions.create_table()
+
+        self.signal_id = self.writer.insert_signal({
+            "telegram_channel_title": "test_channel",
+            "telegram_message_id": 123,
+            "telegram_message_chatid": 456,
+            "open_price": 1.0850,
+            "second_price": None,
+            "stop_loss": 1.0800,
+            "tp_list": "1.0900,1.0950",
+            "symbol": "EURUSD",
+            "current_time": "2023-11-11 10:00:00"
+        })
+        positions.insert_position({
+            "signal_id": self.signal_id,
+            "position_id": 12345,
+            "user_id": 1
+        })
+
+    def test_stop_loss_update_visible_to_other_instance(self):
+        """A stop loss written through one instance is read back by another"""
+        self.assertEqual(self.reader.get_signal_by_position_id(12345).stop_loss, 1.0800)
+
+        self.writer.update_stop_loss(self.signal_id, 1.0820)
+
+        self.assertEqual(self.reader.get_signal_by_position_id(12345).stop_loss, 1.0820)
+
+    def test_take_profit_update_visible_to_batched_lookup(self):
+        """TP levels written through one instance reach another's batched lookup"""
+        before = self.reader.get_signals_by_position_ids([12345])
+        self.assertEqual(before[12345].tp_list, "1.0900,1.0950")
+
+        self.writer.update_take_profits(self.signal_id, [1.0910, 1.0960])
+
+        after = self.reader.get_signals_by_position_ids([12345])
+        self.assertEqual(after[12345].tp_list, "1.091,1.096")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
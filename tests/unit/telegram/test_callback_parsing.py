@@ -0,0 +1,110 @@
+"""Unit tests for manager bot callback data parsing"""
+
+import unittest
+from tests.fixtures import TestBase
+from app.Providers.telegram.manager_bot.handlers import (
+    _CAL_RE, CallbackError, _parse_callback
+)
+
+
+class TestParseCallback(TestBase):
+    """Test cases for _parse_callback route schemas"""
+
+    def test_routes(self):
+        """Test that each route yields its key and typed arguments"""
+        cases = [
+            ("signal_12", ("signal", (12,))),
+            ("position_345", ("position", (345,))),
+            ("delete_678", ("delete", (678,))),
+            ("close_12_full", ("close", (12, "full"))),
+            ("close_12_custom", ("close", (12, "custom"))),
+            ("close_lot_12-0.05", ("close_lot", (12, 0.05))),
+            ("close_lot_12-1", ("close_lot", (12, 1.0))),
+            ("update_12_sl", ("update", (12, "sl"))),
+            ("update_12_tp", ("update", (12, "tp"))),
+            ("manage_12_open", ("manage", (12, "open"))),
+            ("manage_12_second", ("manage", (12, "second"))),
+            ("history_detail_3", ("history_detail", (3,))),
+            ("analyze_detail_0", ("analyze_detail", (0,))),
+        ]
+        for callback_data, expected in cases:
+            with self.subTest(callback_data=callback_data):
+                self.assertEqual(_parse_callback(callback_data), expected)
+
+    def test_calendar_routes(self):
+        """Test calendar navigation and day callbacks, with the mode defaulting to 'from'"""
+        cases = [
+            ("cal_prev_2024_1_from", ("cal_prev", (2024, 1, "from"))),
+            ("cal_next_2024_12_to", ("cal_next", (2024, 12, "to"))),
+            ("cal_next_2024_12", ("cal_next", (2024, 12, "from"))),
+            ("cal_day_2024_2_29_to", ("cal_day", (2024, 2, 29, "to"))),
+            ("cal_day_2024_2_29", ("cal_day", (2024, 2, 29, "from"))),
+        ]
+        for callback_data, expected in cases:
+            with self.subTest(callback_data=callback_data):
+                self.assertEqual(_parse_callback(callback_data), expected)
+
+    def test_unknown_route_returns_none(self):
+        """Test that data matching no route is not treated as malformed"""
+        for callback_data in ("unknown_1", "foo", "signals_list_1"):
+            with self.subTest(callback_data=callback_data):
+                self.assertIsNone(_parse_callback(callback_data))
+
+    def test_malformed_payload_raises_callback_error(self):
+        """Test that a known route with bad arguments raises CallbackError"""
+        cases = [
+            "signal_",
+            "signal_abc",
+            "signal_-1",
+            "signal_1_000",
+            "signal_ 7",
+            "position_1.5",
+            "close_12",
+            "close_x_full",
+            "close_12_",
+            "close_lot_12",
+            "close_lot_12-",
+            "close_lot_-0.05",
+            "close_lot_x-0.05",
+            "close_lot_12-0.0.5",
+            "update_12",
+            "history_detail_",
+            "history_detail_x",
+            "cal_day_2024_2",
+            "cal_prev_2024_1_2",
+            "cal_day_2024_x_1",
+            "cal_day_2024_2_29_sideways",
+            "cal_week_2024_1",
+        ]
+        for callback_data in cases:
+            with self.subTest(callback_data=callback_data):
+                with self.assertRaises(CallbackError):
+                    _parse_callback(callback_data)
+
+
+class TestCalendarRegex(TestBase):
+    """Test cases for the calendar callback regex"""
+
+    def test_groups(self):
+        """Test captured groups, including the optional day and mode"""
+        cases = [
+            ("cal_prev_2024_1_from", ("prev", "2024", "1", None, "from")),
+            ("cal_next_2024_12", ("next", "2024", "12", None, None)),
+            ("cal_day_2024_2_29_to", ("day", "2024", "2", "29", "to")),
+            ("cal_day_2024_2_29", ("day", "2024", "2", "29", None)),
+        ]
+        for callback_data, groups in cases:
+            with self.subTest(callback_data=callback_data):
+                match = _CAL_RE.fullmatch(callback_data)
+                self.assertIsNotNone(match)
+                self.assertEqual(match.groups(), groups)
+
+    def test_rejects(self):
+        """Test data the regex must not match in full"""
+        for callback_data in ("cal_noop", "cal_day_2024", "cal_prev_2024_1_from_x", "cal_day_٢٠٢٤_1_1"):
+            with self.subTest(callback_data=callback_data):
+                self.assertIsNone(_CAL_RE.fullmatch(callback_data))
+
+
+if __name__ == '__main__':
+    unittest.main()
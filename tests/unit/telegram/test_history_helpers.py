@@ -0,0 +1,83 @@
+"""Unit tests for manager bot history helpers"""
+
+import unittest
+from datetime import timedelta
+from tests.fixtures import TestBase
+from app.Providers.telegram.manager_bot.history_helpers import (
+    EXIT_MANUAL_CLOSE, EXIT_STOP_LOSS,
+    _classify_exit, _parse_tp_levels, format_timedelta
+)
+
+
+class TestParseTpLevels(TestBase):
+    """Test cases for _parse_tp_levels"""
+
+    def test_inputs(self):
+        """Test string, list and unsupported TP inputs"""
+        cases = [
+            ("1.0900,1.0950", (1.09, 1.095)),
+            (" 1.0900 , 1.0950 ,", (1.09, 1.095)),
+            ("", ()),
+            ("1.0900,abc", ()),
+            ([1.09, "1.095"], (1.09, 1.095)),
+            ([1.09, "abc", None, 1.1], (1.09, None, None, 1.1)),
+            ([], ()),
+            (None, ()),
+            (1.09, ()),
+        ]
+        for tp_list, expected in cases:
+            with self.subTest(tp_list=tp_list):
+                self.assertEqual(_parse_tp_levels(tp_list), expected)
+
+
+class TestClassifyExit(TestBase):
+    """Test cases for _classify_exit"""
+
+    def test_exit_reasons(self):
+        """Test SL, numbered TP and manual close classification"""
+        tp_levels = (1.0900, None, 1.1000)
+        cases = [
+            (1.0800, 1.0800, "sl exact"),
+            (1.0805, 1.0800, "sl within threshold"),
+            (1.0900, 1.0800, "tp1"),
+            (1.0995, 1.0800, "tp3 within threshold"),
+            (1.0850, 1.0800, "between levels"),
+            (1.0800, None, "no sl"),
+        ]
+        expected = [EXIT_STOP_LOSS, EXIT_STOP_LOSS, "TP1", "TP3", EXIT_MANUAL_CLOSE, EXIT_MANUAL_CLOSE]
+        for (exit_price, sl, label), reason in zip(cases, expected):
+            with self.subTest(label):
+                self.assertEqual(_classify_exit(exit_price, sl, tp_levels, 0.0010), reason)
+
+    def test_sl_checked_before_tp(self):
+        """Test that SL wins when both SL and a TP are within the threshold"""
+        self.assertEqual(_classify_exit(1.0900, 1.0900, (1.0900,), 0.0010), EXIT_STOP_LOSS)
+
+    def test_tp_label_is_shared(self):
+        """Test that the same TP index returns the same label object"""
+        first = _classify_exit(1.09, None, (1.09,), 0.001)
+        second = _classify_exit(1.09, None, (1.09,), 0.001)
+        self.assertIs(first, second)
+
+
+class TestFormatTimedelta(TestBase):
+    """Test cases for format_timedelta"""
+
+    def test_formats(self):
+        """Test seconds under a minute and minute bucketing above it"""
+        cases = [
+            (timedelta(0), "0s"),
+            (timedelta(seconds=59), "59s"),
+            (timedelta(seconds=60), "1m"),
+            (timedelta(seconds=119), "1m"),
+            (timedelta(hours=2, minutes=5, seconds=30), "2h 5m"),
+            (timedelta(days=1, seconds=59), "1d"),
+            (timedelta(days=3, hours=4, minutes=1), "3d 4h 1m"),
+        ]
+        for td, expected in cases:
+            with self.subTest(td=td):
+                self.assertEqual(format_timedelta(td), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
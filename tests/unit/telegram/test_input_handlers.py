@@ -0,0 +1,33 @@
+"""Unit tests for manager bot text input parsing"""
+
+import unittest
+from tests.fixtures import TestBase
+from app.Providers.telegram.manager_bot.input_handlers import _try_float
+
+
+class TestTryFloat(TestBase):
+    """Test cases for _try_float"""
+
+    def test_valid(self):
+        """Test plain decimals, with optional sign and surrounding whitespace"""
+        cases = [
+            ("1.2450", 1.245),
+            ("-0.5", -0.5),
+            ("+2", 2.0),
+            ("  0.01 ", 0.01),
+            ("10", 10.0),
+            (".5", 0.5),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(_try_float(text), expected)
+
+    def test_invalid(self):
+        """Test that non-decimal input returns None instead of raising"""
+        for text in ("", "abc", "1.2.3", "1e5", "1_000", "nan", "inf", "--1", "-", ".", "١٢"):
+            with self.subTest(text=text):
+                self.assertIsNone(_try_float(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
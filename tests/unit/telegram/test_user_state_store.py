@@ -0,0 +1,93 @@
+"""Unit tests for the manager bot's UserStateStore"""
+
+import unittest
+from unittest.mock import patch
+from tests.fixtures import TestBase
+from app.Providers.telegram.manager_bot.state import UserState, UserStateStore
+
+
+class TestUserStateStore(TestBase):
+    """Test cases for UserStateStore TTL and LRU behaviour"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = patch('app.Providers.telegram.manager_bot.state.time.monotonic',
+                        side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = UserStateStore(maxsize=3, ttl=60.0)
+
+    def test_get_returns_stored_state(self):
+        """Test that a stored state is returned by get and []"""
+        user_state = UserState("main_menu")
+        self.store[1] = user_state
+
+        self.assertIs(self.store.get(1), user_state)
+        self.assertIs(self.store[1], user_state)
+        self.assertIn(1, self.store)
+
+    def test_getitem_missing_raises_key_error(self):
+        """Test that [] on an unknown user raises KeyError"""
+        with self.assertRaises(KeyError):
+            self.store[42]
+        self.assertIsNone(self.store.get(42))
+        self.assertEqual(self.store.get(42, "default"), "default")
+
+    def test_ttl_expiry(self):
+        """Test that idle sessions expire after ttl seconds"""
+        self.store[1] = UserState("main_menu")
+
+        self.now += 61.0
+
+        self.assertIsNone(self.store.get(1))
+        self.assertNotIn(1, self.store)
+        with self.assertRaises(KeyError):
+            self.store[1]
+        self.assertEqual(len(self.store), 0)
+
+    def test_access_refreshes_ttl(self):
+        """Test that reading a session resets its idle timer"""
+        user_state = UserState("main_menu")
+        self.store[1] = user_state
+
+        self.now += 50.0
+        self.assertIs(self.store[1], user_state)
+        self.now += 50.0
+
+        self.assertIs(self.store.get(1), user_state)
+
+    def test_overflow_evicts_least_recently_used(self):
+        """Test that exceeding maxsize evicts the least recently used user"""
+        for user_id in (1, 2, 3):
+            self.store[user_id] = UserState()
+        self.store.get(1)  # 2 is now the least recently used
+
+        self.store[4] = UserState()
+
+        self.assertEqual(len(self.store), 3)
+        self.assertNotIn(2, self.store)
+        for user_id in (1, 3, 4):
+            self.assertIn(user_id, self.store)
+
+    def test_insert_drops_expired_entries(self):
+        """Test that a write also sweeps sessions that have expired"""
+        self.store[1] = UserState()
+        self.store[2] = UserState()
+
+        self.now += 61.0
+        self.store[3] = UserState()
+
+        self.assertEqual(len(self.store), 1)
+        self.assertIn(3, self.store)
+
+    def test_delete(self):
+        """Test removing a user's state"""
+        self.store[1] = UserState()
+        del self.store[1]
+
+        self.assertNotIn(1, self.store)
+
+
+if __name__ == '__main__':
+    unittest.main()